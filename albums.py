@@ -0,0 +1,234 @@
+import os
+import hashlib
+import threading
+from collections import deque
+from datetime import date
+from app import app, db
+from models import Photo, Project
+import imaging
+import ingest
+import storage
+
+ALBUM_DIRNAME = '.album'
+
+# A4 (포인트 단위, 1pt = 1/72 inch)
+A4_POINTS = (595, 842)
+
+_build_lock = threading.Lock()
+_builds = {}  # project_id -> 생성 완료 시 set되는 Event
+
+
+def _page_pixels(dpi):
+    return tuple(round(points * dpi / 72) for points in A4_POINTS)
+
+
+def album_fingerprint(project, photos):
+    """Hash of everything that shows up in the album; changes only when the project or its photos change"""
+    digest = hashlib.sha256()
+    digest.update(f"{project.name}|{project.address}|{app.config['ALBUM_DPI']}".encode())
+    for photo in photos:
+        digest.update(
+            f"{photo.id}|{photo.filepath}|{photo.file_size}|{photo.filename}|{photo.description}|"
+            f"{photo.photo_location}|{photo.photo_date}\n".encode()
+        )
+    return digest.hexdigest()[:16]
+
+
+def album_path(project_id, fingerprint):
+    return os.path.join(app.config['UPLOAD_FOLDER'], str(project_id), ALBUM_DIRNAME, f"album_{fingerprint}.pdf")
+
+
+def _caption_lines(photo):
+    lines = [photo.description or photo.filename]
+    details = []
+    if photo.photo_location:
+        details.append(photo.photo_location)
+    if photo.photo_date:
+        details.append(photo.photo_date.strftime('%Y-%m-%d'))
+    if details:
+        lines.append(' / '.join(details))
+    return lines
+
+
+def _cover_date(photos):
+    """Date printed on the cover: the latest shooting date, else the latest upload"""
+    shot = [photo.photo_date for photo in photos if photo.photo_date]
+    if shot:
+        return max(shot)
+    uploaded = [photo.uploaded_at for photo in photos if photo.uploaded_at]
+    return max(uploaded).date() if uploaded else date.today()
+
+
+def _page_specs(project, photos):
+    """Cover page followed by ALBUM_PHOTOS_PER_PAGE photos per page"""
+    dpi = app.config['ALBUM_DPI']
+    common = {
+        'size': _page_pixels(dpi),
+        'dpi': dpi,
+        'font_path': app.config['ALBUM_FONT_PATH'],
+        'profile': app.config['IMAGE_PROFILES']['album'],
+    }
+    specs = [dict(common, title_lines=[
+        '준공사진첩',
+        project.name,
+        project.address or '',
+        _cover_date(photos).strftime('%Y년 %m월 %d일'),
+    ])]
+
+    per_page = app.config['ALBUM_PHOTOS_PER_PAGE']
+    page_total = -(-len(photos) // per_page)
+    for page_index, start in enumerate(range(0, len(photos), per_page), start=1):
+        specs.append(dict(
+            common,
+            items=[{'path': storage.local_path(photo.filepath), 'caption_lines': _caption_lines(photo)}
+                   for photo in photos[start:start + per_page]],
+            footer=f"{project.name} - {page_index} / {page_total}",
+        ))
+    return specs
+
+
+def write_pdf(fp, pages, page_count):
+    """Write JPEG page images into a PDF without re-encoding them
+
+    ``pages`` yields ``page_count`` tuples of (jpeg_bytes, width_px,
+    height_px); each is written as soon as it arrives, so only the page in
+    hand is kept in memory. Every page is scaled to A4.
+    """
+    offsets = []
+    position = 0
+
+    def emit(data):
+        nonlocal position
+        fp.write(data)
+        position += len(data)
+
+    def begin_object():
+        offsets.append(position)
+        emit(f"{len(offsets)} 0 obj\n".encode())
+
+    emit(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    # 객체 번호: 1=Catalog, 2=Pages, 이후 페이지마다 Page/Image/Contents 3개
+    page_ids = [3 + index * 3 for index in range(page_count)]
+
+    begin_object()
+    emit(b"<< /Type /Catalog /Pages 2 0 R >>\nendobj\n")
+    begin_object()
+    kids = ' '.join(f"{page_id} 0 R" for page_id in page_ids)
+    emit(f"<< /Type /Pages /Kids [{kids}] /Count {page_count} >>\nendobj\n".encode())
+
+    page_w, page_h = A4_POINTS
+    for page_id, (jpeg, width, height) in zip(page_ids, pages):
+        begin_object()
+        emit(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {page_w} {page_h}] "
+             f"/Resources << /XObject << /Im0 {page_id + 1} 0 R >> >> "
+             f"/Contents {page_id + 2} 0 R >>\nendobj\n".encode())
+        begin_object()
+        emit(f"<< /Type /XObject /Subtype /Image /Width {width} /Height {height} "
+             f"/ColorSpace /DeviceRGB /BitsPerComponent 8 /Filter /DCTDecode "
+             f"/Length {len(jpeg)} >>\nstream\n".encode())
+        emit(jpeg)
+        emit(b"\nendstream\nendobj\n")
+        content = f"q {page_w} 0 0 {page_h} 0 0 cm /Im0 Do Q".encode()
+        begin_object()
+        emit(f"<< /Length {len(content)} >>\nstream\n".encode())
+        emit(content)
+        emit(b"\nendstream\nendobj\n")
+
+    xref_position = position
+    emit(f"xref\n0 {len(offsets) + 1}\n0000000000 65535 f \n".encode())
+    for offset in offsets:
+        emit(f"{offset:010d} 00000 n \n".encode())
+    emit(f"trailer\n<< /Size {len(offsets) + 1} /Root 1 0 R >>\nstartxref\n{xref_position}\n%%EOF\n".encode())
+
+
+def _render_pages(specs):
+    """Yield (jpeg, width, height) per spec in order, rendering a bounded window ahead on the process pool"""
+    executor = ingest.get_executor()
+    ahead = 2 * (app.config['INGEST_WORKERS'] or os.cpu_count() or 1)
+    in_flight = deque()
+    for spec in specs:
+        in_flight.append((executor.submit(imaging.render_album_page, spec), spec['size']))
+        if len(in_flight) >= ahead:
+            future, size = in_flight.popleft()
+            yield (future.result(), *size)
+    while in_flight:
+        future, size = in_flight.popleft()
+        yield (future.result(), *size)
+
+
+def _album_photos(project_id):
+    return Photo.query.filter_by(project_id=project_id).order_by(Photo.uploaded_at.asc(), Photo.id.asc()).all()
+
+
+def current_album(project_id):
+    """Path of the album for the project's current photos, or None without photos"""
+    project = db.session.get(Project, project_id)
+    photos = _album_photos(project_id)
+    if project is None or not photos:
+        return None
+    return album_path(project_id, album_fingerprint(project, photos))
+
+
+def build_album(project_id):
+    """Return the path of the project's album PDF, rendering it if photos changed
+
+    Pages are rendered in parallel and appended to the PDF in order as they
+    complete. Slow for large projects, so requests go through schedule_album().
+    """
+    project = db.session.get(Project, project_id)
+    photos = _album_photos(project_id)
+    if project is None or not photos:
+        return None
+
+    path = album_path(project_id, album_fingerprint(project, photos))
+    if os.path.exists(path):
+        return path
+
+    specs = _page_specs(project, photos)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            write_pdf(f, _render_pages(specs), len(specs))
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    # 이전 버전 앨범 삭제
+    for name in os.listdir(os.path.dirname(path)):
+        if name.endswith('.pdf') and name != os.path.basename(path):
+            try:
+                os.remove(os.path.join(os.path.dirname(path), name))
+            except OSError:
+                pass
+    return path
+
+
+def _run_build(project_id, done):
+    try:
+        with app.app_context():
+            path = build_album(project_id)
+            app.logger.info(f"Album for project {project_id} ready: {path}")
+    except Exception as e:
+        app.logger.error(f"Error creating album PDF for project {project_id}: {e}")
+    finally:
+        with _build_lock:
+            _builds.pop(project_id, None)
+        done.set()
+
+
+def schedule_album(project_id):
+    """Build the project's album in a background thread (once at a time)
+
+    Returns an Event that is set when the running build finishes, whether
+    or not it succeeded.
+    """
+    with _build_lock:
+        done = _builds.get(project_id)
+        if done is not None:
+            return done
+        done = _builds[project_id] = threading.Event()
+    threading.Thread(target=_run_build, args=(project_id, done), name=f'album-{project_id}', daemon=True).start()
+    return done
@@ -1,58 +1,161 @@
 import os
+import sys
+import time
 import logging
-from flask import Flask
+import click
+from flask import Flask, current_app, has_app_context
+from flask.cli import AppGroup
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy.orm import DeclarativeBase
 from werkzeug.middleware.proxy_fix import ProxyFix
-
-# Configure logging
-logging.basicConfig(level=logging.DEBUG)
+import config
 
 class Base(DeclarativeBase):
     pass
 
 db = SQLAlchemy(model_class=Base)
 
-# Create the app
-app = Flask(__name__)
-app.secret_key = os.environ.get("SESSION_SECRET", "dev-secret-key-change-in-production")
-app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)
+class AppSetup:
+    """What modules import as ``app``: a registry standing in for the Flask app
+
+    Modules attach their views, request hooks and CLI commands to it when
+    imported; create_app() builds a new Flask object and replays every
+    registration on it, so each call returns a fresh app. Any other
+    attribute (config, logger, app_context, ...) resolves to the active
+    app, or outside an app context to the one created last, which is the
+    only one in a server or worker process.
+    """
+
+    def __init__(self):
+        self._deferred = []
+        self.cli = AppGroup()
+        self.current = None
+
+    def route(self, rule, **options):
+        def decorator(f):
+            self._deferred.append(lambda flask_app: flask_app.route(rule, **options)(f))
+            return f
+        return decorator
+
+    def before_request(self, f):
+        self._deferred.append(lambda flask_app: flask_app.before_request(f))
+        return f
+
+    def after_request(self, f):
+        self._deferred.append(lambda flask_app: flask_app.after_request(f))
+        return f
 
-# Configure the database
-app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get("DATABASE_URL")
-app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
-    "pool_recycle": 300,
-    "pool_pre_ping": True,
-}
+    def setup(self, flask_app):
+        """Register everything recorded so far on ``flask_app`` and make it current"""
+        for register in self._deferred:
+            register(flask_app)
+        for command in self.cli.commands.values():
+            flask_app.cli.add_command(command)
+        self.current = flask_app
 
+    def __getattr__(self, name):
+        if has_app_context():
+            return getattr(current_app._get_current_object(), name)
+        if self.current is None:
+            raise RuntimeError("create_app() has not been called yet")
+        return getattr(self.current, name)
 
 
-# Configure upload settings
-app.config['MAX_CONTENT_LENGTH'] = 100 * 1024 * 1024  # 100MB max request size
-app.config['UPLOAD_FOLDER'] = 'uploads'
+# 라우트/명령은 각 모듈이 임포트될 때 여기에 등록되고 create_app()이 새 앱에 적용
+app = AppSetup()
 
-# Initialize the app with the extension
-db.init_app(app)
 
-# Create uploads directory if it doesn't exist
-os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+def create_app(profile=None):
+    """Build a configured Flask app with every route and command registered
 
-with app.app_context():
-    # Import models to ensure tables are created
+    Each call returns a new app; the modules that define views are imported
+    on the first call and their registrations replayed on later ones.
+    Nothing here touches the database: schema changes are applied by
+    ``flask migrate-db`` (or at startup when the profile sets AUTO_MIGRATE,
+    as development does).
+    """
+    started = time.perf_counter()
+
+    profile = profile or config.profile_name()
+    flask_app = Flask(__name__)
+    flask_app.config.from_object(config.PROFILES[profile])
+    logging.basicConfig(level=flask_app.config['LOG_LEVEL'])
+    flask_app.wsgi_app = ProxyFix(flask_app.wsgi_app, x_proto=1, x_host=1)
+    if profile == 'production' and 'SESSION_SECRET' not in os.environ:
+        flask_app.logger.warning("SESSION_SECRET is not set; using the development secret key")
+
+    # Initialize the app with the extension
+    db.init_app(flask_app)
+
+    # Create uploads directory if it doesn't exist
+    os.makedirs(flask_app.config['UPLOAD_FOLDER'], exist_ok=True)
+
+    # Import models and routes (CLI 명령도 함께 등록됨)
     import models
-    
-    # Import routes
     import routes
-    
-    # Create all tables
-    db.create_all()
+    import bulk_import
+    import metrics
+    import schema
+
+    app.setup(flask_app)
+    flask_app.register_error_handler(413, too_large)
+
+    if flask_app.config['AUTO_MIGRATE']:
+        with flask_app.app_context():
+            schema.migrate()
+
+    flask_app.logger.info(f"App created ({profile}) in {(time.perf_counter() - started) * 1000:.0f} ms")
+    return flask_app
+
 
 # Error handler for file size limit exceeded
-@app.errorhandler(413)
 def too_large(e):
     from flask import flash, redirect, url_for, request
     flash('파일 크기가 너무 큽니다. 최대 500MB까지 업로드 가능합니다. 여러 파일을 나누어서 업로드해주세요.', 'error')
     return redirect(request.referrer or url_for('index'))
 
+
+def measure_startup(runs):
+    """Cold start times in ms: a new interpreter importing main (and so calling create_app)
+
+    Runs with the production profile, which is what gunicorn workers pay.
+    """
+    import subprocess
+    code = ("import time; started = time.perf_counter(); import main; "
+            "print((time.perf_counter() - started) * 1000)")
+    env = dict(os.environ, APP_ENV='production')
+    samples = []
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, env=env,
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+        if result.returncode != 0:
+            raise RuntimeError(f"Startup failed:\n{result.stderr}")
+        samples.append(float(result.stdout.split()[-1]))
+    return samples
+
+
+@app.cli.command('check-startup')
+@click.option('--runs', type=int, default=5, show_default=True)
+@click.option('--budget-ms', type=int, default=None, help='Fail above this median (default: STARTUP_BUDGET_MS)')
+def check_startup(runs, budget_ms):
+    """Measure cold start (new interpreter, import and create_app) against the budget
+
+    Exits non-zero when the median is over budget, so CI can run it.
+    """
+    import statistics
+    budget_ms = budget_ms or app.config['STARTUP_BUDGET_MS']
+    try:
+        samples = measure_startup(runs)
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+
+    median = statistics.median(samples)
+    click.echo(f"Startup: median {median:.0f} ms, max {max(samples):.0f} ms over {runs} runs (budget {budget_ms} ms)")
+    if median > budget_ms:
+        raise click.ClickException(f"Startup time {median:.0f} ms exceeds the budget of {budget_ms} ms")
+
+
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    # 각 모듈은 'app' 모듈의 객체에 등록되므로 이름으로 다시 임포트해서 실행
+    from app import create_app
+    create_app().run(host='0.0.0.0', port=5000, debug=True)
@@ -0,0 +1,315 @@
+import os
+import copy
+import json
+import shutil
+import struct
+import threading
+import zipfile
+from app import app, db
+from models import Photo, Project
+import metrics
+import storage
+
+ARCHIVE_DIRNAME = '.archive'
+
+# 이미 압축된 이미지 형식은 다시 deflate 해도 크기가 줄지 않음
+STORED_EXTENSIONS = {'jpg', 'jpeg', 'png', 'gif', 'webp'}
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class _StreamBuffer:
+    """Write-only file object collecting ZIP output until the generator drains it"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def compress_type_for(filename):
+    """STORED for already-compressed images, DEFLATED for everything else"""
+    ext = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    return zipfile.ZIP_STORED if ext in STORED_EXTENSIONS else zipfile.ZIP_DEFLATED
+
+
+def stream_zip(members, chunk_size=CHUNK_SIZE):
+    """Yield a ZIP64-capable archive chunk by chunk
+
+    ``members`` is an iterable of (filepath, arcname) tuples, ``filepath``
+    being a Photo.filepath value (see storage). Missing files are skipped. Only one chunk is held in memory at a time and
+    nothing is written to disk.
+    """
+    buffer = _StreamBuffer()
+    # 탐색 불가능한 스트림이므로 zipfile이 data descriptor를 사용함
+    with zipfile.ZipFile(buffer, 'w', allowZip64=True) as zipf:
+        for filepath, arcname in members:
+            try:
+                source_path = storage.local_path(filepath)
+                # file_size가 미리 설정되므로 큰 파일은 자동으로 ZIP64 헤더 사용
+                zinfo = zipfile.ZipInfo.from_file(source_path, arcname)
+            except OSError:
+                continue
+            zinfo.compress_type = compress_type_for(arcname)
+
+            with open(source_path, 'rb') as src, zipf.open(zinfo, 'w') as dest:
+                while True:
+                    block = src.read(chunk_size)
+                    if not block:
+                        break
+                    dest.write(block)
+                    data = buffer.drain()
+                    if data:
+                        yield data
+
+            data = buffer.drain()
+            if data:
+                yield data
+
+    # 중앙 디렉터리(central directory) 기록
+    data = buffer.drain()
+    if data:
+        yield data
+
+
+# ---------------------------------------------------------------------------
+# 프로젝트별 아카이브 스냅샷 (revision 기준 캐시)
+# ---------------------------------------------------------------------------
+
+_build_lock = threading.Lock()
+_building = set()
+
+
+def project_members(project_id):
+    """(filepath, arcname) of every photo in the project, in archive order"""
+    return db.session.query(Photo.filepath, Photo.filename).filter_by(
+        project_id=project_id).order_by(Photo.id).all()
+
+
+def archive_dir(project_id):
+    return os.path.join(app.config['UPLOAD_FOLDER'], str(project_id), ARCHIVE_DIRNAME)
+
+
+def snapshot_path(project_id, revision):
+    return os.path.join(archive_dir(project_id), f"project_r{revision}.zip")
+
+
+def _manifest_path(path):
+    return path[:-len('.zip')] + '.json'
+
+
+def _signature(source_path):
+    """Identifies the exact bytes of a member file without reading it"""
+    stat = os.stat(source_path)
+    return f"{os.path.abspath(source_path)}|{stat.st_size}|{stat.st_mtime_ns}"
+
+
+def _latest_snapshot(project_id):
+    """(path, manifest) of the newest complete snapshot, or (None, {})"""
+    best = None
+    try:
+        names = os.listdir(archive_dir(project_id))
+    except FileNotFoundError:
+        return None, {}
+    for name in names:
+        if name.startswith('project_r') and name.endswith('.zip'):
+            try:
+                revision = int(name[len('project_r'):-len('.zip')])
+            except ValueError:
+                continue
+            if best is None or revision > best[0]:
+                best = (revision, os.path.join(archive_dir(project_id), name))
+    if best is None:
+        return None, {}
+    try:
+        with open(_manifest_path(best[1])) as f:
+            return best[1], json.load(f)
+    except (OSError, ValueError):
+        return None, {}
+
+
+def _strip_zip64_extra(extra):
+    """Drop the ZIP64 extra field; FileHeader() writes a fresh one when needed"""
+    result = b''
+    while len(extra) >= 4:
+        header_id, size = struct.unpack('<HH', extra[:4])
+        if header_id != 1:
+            result += extra[:4 + size]
+        extra = extra[4 + size:]
+    return result
+
+
+def _copy_member(source_fp, info, zout):
+    """Append a member's already-compressed bytes from another archive
+
+    No decompression, CRC or recompression: the local header is rewritten
+    for the new offset and the data is copied as-is. Relies on ZipFile
+    keeping its entries in filelist/NameToInfo and writing the central
+    directory from them on close.
+    """
+    source_fp.seek(info.header_offset)
+    local_header = source_fp.read(zipfile.sizeFileHeader)
+    name_length, extra_length = struct.unpack('<HH', local_header[26:30])
+    source_fp.seek(info.header_offset + zipfile.sizeFileHeader + name_length + extra_length)
+
+    zinfo = copy.copy(info)
+    zinfo.extra = _strip_zip64_extra(info.extra)
+    zinfo.header_offset = zout.fp.tell()
+    zip64 = info.file_size > zipfile.ZIP64_LIMIT or info.compress_size > zipfile.ZIP64_LIMIT
+    zout.fp.write(zinfo.FileHeader(zip64))
+
+    remaining = info.compress_size
+    while remaining:
+        block = source_fp.read(min(CHUNK_SIZE, remaining))
+        if not block:
+            raise OSError(f"Snapshot truncated while copying {info.filename}")
+        zout.fp.write(block)
+        remaining -= len(block)
+
+    zout.filelist.append(zinfo)
+    zout.NameToInfo[zinfo.filename] = zinfo
+    zout.start_dir = zout.fp.tell()
+    zout._didModify = True
+
+
+def build_snapshot(project_id, revision, members):
+    """Write the archive for ``revision``, reusing unchanged members of the previous snapshot
+
+    Returns (path, copied, added). Members whose file is byte-for-byte the
+    same as in the previous snapshot (same path, size and mtime) are copied
+    compressed; only new or changed photos are read from their sources.
+    """
+    path = snapshot_path(project_id, revision)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    previous_path, previous_manifest = _latest_snapshot(project_id)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+    manifest = {}
+    copied = added = 0
+    previous = source_fp = None
+    try:
+        if previous_path:
+            previous = zipfile.ZipFile(previous_path)
+            source_fp = open(previous_path, 'rb')
+        with open(tmp_path, 'wb') as out, zipfile.ZipFile(out, 'w', allowZip64=True) as zout:
+            for filepath, arcname in members:
+                try:
+                    source_path = storage.local_path(filepath)
+                    signature = _signature(source_path)
+                except OSError:
+                    continue
+                if arcname in manifest:
+                    # 같은 파일명이 중복되면 첫 번째만 포함
+                    continue
+                manifest[arcname] = signature
+
+                info = previous.NameToInfo.get(arcname) if previous else None
+                if info is not None and previous_manifest.get(arcname) == signature and not info.flag_bits & 0x08:
+                    _copy_member(source_fp, info, zout)
+                    copied += 1
+                    continue
+
+                zinfo = zipfile.ZipInfo.from_file(source_path, arcname)
+                zinfo.compress_type = compress_type_for(arcname)
+                with open(source_path, 'rb') as src, zout.open(zinfo, 'w') as dest:
+                    shutil.copyfileobj(src, dest, CHUNK_SIZE)
+                added += 1
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    finally:
+        if previous is not None:
+            previous.close()
+        if source_fp is not None:
+            source_fp.close()
+
+    # 매니페스트를 먼저 기록해야 스냅샷이 보이는 순간 항상 짝이 맞음
+    with open(_manifest_path(path), 'w') as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, path)
+
+    for name in os.listdir(os.path.dirname(path)):
+        old = os.path.join(os.path.dirname(path), name)
+        if name.startswith('project_r') and old not in (path, _manifest_path(path)) and not name.endswith('.tmp'):
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+    return path, copied, added
+
+
+def _run_build(project_id):
+    try:
+        with app.app_context():
+            # revision을 먼저 읽어야 스냅샷이 해당 revision보다 오래된 내용이 되지 않음
+            revision = db.session.query(Project.revision).filter_by(id=project_id).scalar()
+            if revision is None:
+                return
+            path, copied, added = build_snapshot(project_id, revision, project_members(project_id))
+            app.logger.info(f"Archive snapshot {path}: {copied} members reused, {added} added")
+            enforce_cache_limit()
+    except Exception as e:
+        app.logger.error(f"Error building archive snapshot for project {project_id}: {e}")
+    finally:
+        with _build_lock:
+            _building.discard(project_id)
+
+
+def schedule_snapshot(project_id):
+    """Build the project's current snapshot in a background thread (once at a time)"""
+    with _build_lock:
+        if project_id in _building:
+            return
+        _building.add(project_id)
+    threading.Thread(target=_run_build, args=(project_id,), name=f'archive-{project_id}', daemon=True).start()
+
+
+def cached_snapshot(project):
+    """Path of the snapshot for the project's current revision, or None"""
+    path = snapshot_path(project.id, project.revision)
+    try:
+        # LRU 정리를 위해 사용 시각 갱신
+        os.utime(path)
+    except FileNotFoundError:
+        metrics.ARCHIVE_CACHE.inc('miss')
+        return None
+    metrics.ARCHIVE_CACHE.inc('hit')
+    return path
+
+
+def enforce_cache_limit(max_bytes=None):
+    """Evict least recently downloaded snapshots until all of them fit the cap"""
+    if max_bytes is None:
+        max_bytes = app.config['ARCHIVE_CACHE_MAX_BYTES']
+    upload_root = app.config['UPLOAD_FOLDER']
+    entries = []
+    for project_entry in os.scandir(upload_root):
+        directory = os.path.join(project_entry.path, ARCHIVE_DIRNAME)
+        if not project_entry.is_dir() or not os.path.isdir(directory):
+            continue
+        for entry in os.scandir(directory):
+            if entry.is_file() and entry.name.endswith('.zip'):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        for victim in (path, _manifest_path(path)):
+            try:
+                os.remove(victim)
+            except OSError:
+                pass
+        total -= size
@@ -0,0 +1,470 @@
+"""Reproducible benchmark for the upload, thumbnail, listing and export paths.
+
+Runs the app in-process behind a local threaded HTTP server against a fresh
+SQLite database (or the Postgres given with --database-url) and a synthetic
+image corpus:
+
+    python benchmark.py --output bench/results.json
+    python benchmark.py --quick --compare bench/results.json
+
+Every scenario reports p50/p95/p99 latency, throughput and error count.
+Peak RSS of the server process and its image workers is reported at the
+end. Results are saved as JSON together with the current git commit.
+"""
+import os
+import io
+import sys
+import json
+import time
+import uuid
+import shutil
+import argparse
+import resource
+import tempfile
+import threading
+import subprocess
+import http.client
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(name, latencies, errors, elapsed, extra=None):
+    count = len(latencies)
+    result = {
+        'scenario': name,
+        'requests': count,
+        'errors': errors,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2) if count else None,
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2) if count else None,
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2) if count else None,
+        'throughput_rps': round(count / elapsed, 2) if elapsed else None,
+        'elapsed_s': round(elapsed, 3),
+    }
+    result.update(extra or {})
+    return result
+
+
+# ---------------------------------------------------------------------------
+# Synthetic corpus
+# ---------------------------------------------------------------------------
+
+def make_phone_jpeg(size, seed):
+    """Phone-style JPEG with an EXIF orientation tag (rotated 90 degrees)"""
+    from PIL import Image
+    base = Image.effect_noise((size[0] // 16, size[1] // 16), 60 + seed % 40).convert('RGB')
+    img = base.resize(size, Image.Resampling.BICUBIC)
+    exif = Image.Exif()
+    exif[0x0112] = 6  # Orientation: rotate 270
+    output = io.BytesIO()
+    img.save(output, 'JPEG', quality=92, exif=exif)
+    return output.getvalue()
+
+
+def make_alpha_png(size, seed):
+    """Large PNG screenshot-like image with an alpha channel"""
+    from PIL import Image
+    rgb = Image.effect_noise((size[0] // 8, size[1] // 8), 30 + seed % 40).convert('RGB')
+    img = rgb.resize(size, Image.Resampling.NEAREST).convert('RGBA')
+    img.putalpha(Image.linear_gradient('L').resize(size))
+    output = io.BytesIO()
+    img.save(output, 'PNG')
+    return output.getvalue()
+
+
+def build_corpus(args):
+    corpus = []
+    for index in range(args.corpus_size):
+        if index % 4 == 3:
+            corpus.append((f'screen_{index}.png', make_alpha_png(args.png_size, index), 'image/png'))
+        else:
+            corpus.append((f'2024-05-{index % 28 + 1:02d}_{index}.jpg',
+                           make_phone_jpeg(args.jpeg_size, index), 'image/jpeg'))
+    return corpus
+
+
+# ---------------------------------------------------------------------------
+# HTTP helpers
+# ---------------------------------------------------------------------------
+
+class Client:
+    """Tiny keep-alive HTTP client, one per worker thread"""
+
+    def __init__(self, port):
+        self.port = port
+        self.local = threading.local()
+
+    def _conn(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = self.local.conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=600)
+        return conn
+
+    def request(self, method, path, body=None, headers=None):
+        conn = self._conn()
+        try:
+            conn.request(method, path, body=body, headers=headers or {})
+            response = conn.getresponse()
+            data = response.read()
+            return response.status, data
+        except (http.client.HTTPException, OSError):
+            self.local.conn = None
+            raise
+
+
+def encode_multipart(fields, files):
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    for name, (filename, data, content_type) in files:
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+            f'Content-Type: {content_type}\r\n\r\n'.encode() + data + b'\r\n')
+    parts.append(f'--{boundary}--\r\n'.encode())
+    return b''.join(parts), f'multipart/form-data; boundary={boundary}'
+
+
+def run_requests(name, client, jobs, concurrency, ok_status=(200, 206, 302, 304)):
+    """Run (method, path, body, headers) jobs at the given concurrency"""
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+
+    def run(job):
+        nonlocal errors
+        method, path, body, headers = job
+        started = time.perf_counter()
+        try:
+            status, _ = client.request(method, path, body, headers)
+        except Exception:
+            status = None
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+            if status not in ok_status:
+                errors += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(run, jobs))
+    return latencies, errors, time.perf_counter() - started
+
+
+# ---------------------------------------------------------------------------
+# Scenarios
+# ---------------------------------------------------------------------------
+
+def bench_upload(ctx, args):
+    jobs = []
+    for index in range(args.upload_requests):
+        batch = [ctx['corpus'][(index * args.upload_batch + i) % len(ctx['corpus'])]
+                 for i in range(args.upload_batch)]
+        # 파일명이 매번 달라야 같은 내용도 별도 사진으로 등록됨
+        files = [('photos', (f'{index}_{filename}', data, content_type)) for filename, data, content_type in batch]
+        body, content_type = encode_multipart({'default_description': 'bench'}, files)
+        jobs.append(('POST', f"/upload_photos/{ctx['upload_project']}", body, {'Content-Type': content_type}))
+    bytes_sent = sum(len(job[2]) for job in jobs)
+
+    latencies, errors, elapsed = run_requests('upload_photos', ctx['client'], jobs, args.concurrency)
+
+    # 백그라운드 압축이 끝날 때까지 대기
+    drain_started = time.perf_counter()
+    while True:
+        status, data = ctx['client'].request('GET', f"/photo_status/{ctx['upload_project']}")
+        if status != 200 or json.loads(data)['pending'] == 0:
+            break
+        time.sleep(0.2)
+    drain = time.perf_counter() - drain_started
+
+    photos = args.upload_requests * args.upload_batch
+    return summarize('upload_photos', latencies, errors, elapsed, {
+        'photos': photos,
+        'mb_sent': round(bytes_sent / 1e6, 2),
+        'ingest_drain_s': round(drain, 3),
+        'photos_per_s_end_to_end': round(photos / (elapsed + drain), 2),
+    })
+
+
+def _photo_ids(ctx, project_id):
+    from models import Photo
+    with ctx['app'].app_context():
+        return [photo_id for (photo_id,) in ctx['db'].session.query(Photo.id).filter_by(project_id=project_id)]
+
+
+def bench_thumbnail(ctx, args):
+    ids = _photo_ids(ctx, ctx['upload_project'])
+    results = []
+    for label in ('cold', 'warm'):
+        jobs = [('GET', f'/photo_thumbnail/{photo_id}', None, None) for photo_id in ids]
+        latencies, errors, elapsed = run_requests('photo_thumbnail', ctx['client'], jobs, args.concurrency)
+        results.append(summarize(f'photo_thumbnail_{label}', latencies, errors, elapsed))
+    return results
+
+
+def bench_listing(ctx, args):
+    project_id = ctx['large_project']
+    results = []
+
+    jobs = [('GET', f'/view_photos/{project_id}', None, None)] * args.listing_requests
+    latencies, errors, elapsed = run_requests('view_photos', ctx['client'], jobs, args.concurrency)
+    results.append(summarize('view_photos', latencies, errors, elapsed))
+
+    # 커서를 따라 전체 목록 순회 (마지막 페이지도 첫 페이지와 비슷한 비용이어야 함)
+    latencies, errors = [], 0
+    cursor = None
+    started = time.perf_counter()
+    while True:
+        path = f'/photo_list/{project_id}?limit=100' + (f'&cursor={cursor}' if cursor else '')
+        t0 = time.perf_counter()
+        status, data = ctx['client'].request('GET', path)
+        latencies.append(time.perf_counter() - t0)
+        if status != 200:
+            errors += 1
+            break
+        cursor = json.loads(data)['next_cursor']
+        if not cursor:
+            break
+    results.append(summarize('photo_list_full_scan', latencies, errors, time.perf_counter() - started,
+                             {'first_page_ms': round(latencies[0] * 1000, 2),
+                              'last_page_ms': round(latencies[-1] * 1000, 2)}))
+    return results
+
+
+def bench_download_all(ctx, args):
+    jobs = [('GET', f"/download_all_photos/{ctx['upload_project']}", None, None)] * args.download_requests
+    latencies, errors, elapsed = run_requests('download_all_photos', ctx['client'], jobs,
+                                              min(args.concurrency, args.download_requests))
+    return summarize('download_all_photos', latencies, errors, elapsed)
+
+
+def bench_batch_edit(ctx, args):
+    ids = _photo_ids(ctx, ctx['large_project'])[:args.batch_edit_size]
+    body = f"photo_ids={','.join(map(str, ids))}&updateLocation=1&location=bench".encode()
+    headers = {'Content-Type': 'application/x-www-form-urlencoded'}
+    jobs = [('POST', f"/batch_edit_photos/{ctx['large_project']}", body, headers)] * args.batch_edit_requests
+    latencies, errors, elapsed = run_requests('batch_edit_photos', ctx['client'], jobs, args.concurrency)
+    return summarize('batch_edit_photos', latencies, errors, elapsed, {'photos_per_request': len(ids)})
+
+
+def bench_decode_profiles(ctx, args):
+    """Compress and thumbnail every corpus image in-process with each decode profile"""
+    import imaging
+    from PIL import Image
+    workdir = os.path.join(ctx['app'].config['UPLOAD_FOLDER'], 'decode_profiles')
+    os.makedirs(workdir, exist_ok=True)
+    results = []
+    for operation in ('compress', 'thumb'):
+        baseline = None
+        for profile in ('quality', 'balanced', 'fast'):
+            latencies = []
+            started = time.perf_counter()
+            for index, (filename, data, _) in enumerate(ctx['corpus']):
+                path = os.path.join(workdir, f'{index}_{filename}')
+                with open(path, 'wb') as f:
+                    f.write(data)
+                t0 = time.perf_counter()
+                if operation == 'compress':
+                    imaging.compress_image(path, profile=profile)
+                else:
+                    with Image.open(path) as img:
+                        imaging.decode_scaled(img, (300, 300), profile)
+                        imaging.fit_within(img, (300, 300), profile)
+                latencies.append(time.perf_counter() - t0)
+            result = summarize(f'{operation}_{profile}', latencies, 0, time.perf_counter() - started)
+            baseline = baseline or result['p50_ms']
+            result['speedup_vs_quality'] = round(baseline / result['p50_ms'], 2) if result['p50_ms'] else None
+            results.append(result)
+    shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+SCENARIOS = {
+    'upload': bench_upload,
+    'thumbnail': bench_thumbnail,
+    'listing': bench_listing,
+    'download_all': bench_download_all,
+    'batch_edit': bench_batch_edit,
+    'decode_profiles': bench_decode_profiles,
+}
+
+
+# ---------------------------------------------------------------------------
+# Setup and reporting
+# ---------------------------------------------------------------------------
+
+def seed_large_project(ctx, args):
+    """Insert a project with many photo rows sharing one sample file"""
+    from models import Project, Photo
+    app, db = ctx['app'], ctx['db']
+    sample_path = os.path.join(app.config['UPLOAD_FOLDER'], 'bench_sample.jpg')
+    with open(sample_path, 'wb') as f:
+        f.write(ctx['corpus'][0][1])
+
+    with app.app_context():
+        project = Project(name=f'bench-large-{uuid.uuid4().hex[:8]}')
+        db.session.add(project)
+        db.session.commit()
+        start = datetime(2024, 1, 1)
+        rows = [{
+            'project_id': project.id,
+            'filename': f'2024-01-01_{i}.jpg',
+            'filepath': sample_path,
+            'uploaded_at': start + timedelta(seconds=i),
+            'file_size': len(ctx['corpus'][0][1]),
+        } for i in range(args.large_project_photos)]
+        db.session.execute(db.insert(Photo), rows)
+        db.session.commit()
+        return project.id
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       cwd=os.path.dirname(os.path.abspath(__file__)),
+                                       text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def peak_rss_mb():
+    # ru_maxrss는 리눅스에서 KB 단위
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return round(own / 1024, 1), round(children / 1024, 1)
+
+
+def print_table(results, baseline=None):
+    base = {r['scenario']: r for r in (baseline or {}).get('results', [])}
+    header = f"{'scenario':28} {'reqs':>6} {'err':>4} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'rps':>8}"
+    print(header)
+    print('-' * len(header))
+    for r in results:
+        line = (f"{r['scenario']:28} {r['requests']:>6} {r['errors']:>4} {r['p50_ms'] or 0:>9} "
+                f"{r['p95_ms'] or 0:>9} {r['p99_ms'] or 0:>9} {r['throughput_rps'] or 0:>8}")
+        old = base.get(r['scenario'])
+        if old and old.get('p95_ms') and r.get('p95_ms'):
+            line += f"  p95 {(r['p95_ms'] / old['p95_ms'] - 1) * 100:+.1f}%"
+        print(line)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database-url', help='Database to run against (default: fresh SQLite file)')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help='Comma-separated scenario list')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--corpus-size', type=int, default=12)
+    parser.add_argument('--jpeg-size', type=lambda s: tuple(map(int, s.split('x'))), default=(4032, 3024))
+    parser.add_argument('--png-size', type=lambda s: tuple(map(int, s.split('x'))), default=(2560, 1600))
+    parser.add_argument('--upload-requests', type=int, default=8)
+    parser.add_argument('--upload-batch', type=int, default=5)
+    parser.add_argument('--large-project-photos', type=int, default=10000)
+    parser.add_argument('--listing-requests', type=int, default=50)
+    parser.add_argument('--download-requests', type=int, default=3)
+    parser.add_argument('--batch-edit-size', type=int, default=1000)
+    parser.add_argument('--batch-edit-requests', type=int, default=20)
+    parser.add_argument('--quick', action='store_true', help='Small corpus for a fast smoke run')
+    parser.add_argument('--output', help='Write JSON results to this file')
+    parser.add_argument('--compare', help='Previous JSON results to compare p95 against')
+    parser.add_argument('--keep', action='store_true', help='Keep the temporary work directory')
+    args = parser.parse_args(argv)
+    if args.quick:
+        args.corpus_size = 4
+        args.jpeg_size = (1600, 1200)
+        args.png_size = (1200, 800)
+        args.upload_requests = 3
+        args.upload_batch = 2
+        args.large_project_photos = 2000
+        args.listing_requests = 10
+        args.download_requests = 1
+        args.batch_edit_requests = 5
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    workdir = tempfile.mkdtemp(prefix='photo-bench-')
+    repo_dir = os.path.dirname(os.path.abspath(__file__))
+
+    # 앱은 임포트 시점에 설정을 읽으므로 환경을 먼저 준비
+    os.environ['DATABASE_URL'] = args.database_url or f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ['UPLOAD_FOLDER'] = os.path.join(workdir, 'uploads')
+    sys.path.insert(0, repo_dir)
+    import logging
+    logging.disable(logging.INFO)
+
+    from werkzeug.serving import make_server
+    from app import create_app, db
+    from models import Project
+    import schema
+
+    # 운영 프로필로 측정 (스키마는 운영과 같이 별도로 적용)
+    app = create_app('production')
+    with app.app_context():
+        schema.migrate()
+
+    print(f"Generating corpus ({args.corpus_size} images)...", flush=True)
+    ctx = {'app': app, 'db': db, 'corpus': build_corpus(args)}
+
+    with app.app_context():
+        project = Project(name=f'bench-upload-{uuid.uuid4().hex[:8]}')
+        db.session.add(project)
+        db.session.commit()
+        ctx['upload_project'] = project.id
+    ctx['large_project'] = seed_large_project(ctx, args)
+
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    ctx['client'] = Client(server.server_port)
+
+    results = []
+    try:
+        for name in args.scenarios.split(','):
+            name = name.strip()
+            print(f"Running {name}...", flush=True)
+            outcome = SCENARIOS[name](ctx, args)
+            results.extend(outcome if isinstance(outcome, list) else [outcome])
+    finally:
+        server.shutdown()
+        # 워커 프로세스를 종료해야 RUSAGE_CHILDREN에 최대 메모리가 집계됨
+        import ingest
+        ingest.shutdown()
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    rss_self, rss_children = peak_rss_mb()
+    report = {
+        'commit': git_commit(),
+        'timestamp': datetime.utcnow().isoformat(timespec='seconds'),
+        'database': 'sqlite' if not args.database_url else args.database_url.split(':', 1)[0],
+        'params': {key: value for key, value in vars(args).items()
+                   if key not in ('output', 'compare', 'database_url', 'keep')},
+        'peak_rss_mb': {'server': rss_self, 'workers': rss_children},
+        'results': results,
+    }
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print()
+    print_table(results, baseline)
+    print(f"\nPeak RSS: server {rss_self} MB, image workers {rss_children} MB")
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"Saved {args.output}")
+    return report
+
+
+if __name__ == '__main__':
+    main()
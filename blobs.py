@@ -0,0 +1,311 @@
+import os
+import hashlib
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+import click
+from sqlalchemy.exc import IntegrityError
+from app import app, db
+from models import Blob, Photo
+import storage
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def _tmp_path():
+    tmp_dir = os.path.join(app.config['BLOB_FOLDER'], '.tmp')
+    os.makedirs(tmp_dir, exist_ok=True)
+    return os.path.join(tmp_dir, uuid.uuid4().hex)
+
+
+class BlobWriter:
+    """Incremental writer into the blob store's temporary area
+
+    The content is hashed while it is written, so registering the blob
+    afterwards is a rename on the same filesystem, never another copy.
+    """
+
+    def __init__(self):
+        self.tmp_path = _tmp_path()
+        self.size = 0
+        self._digest = hashlib.sha256()
+        self._file = open(self.tmp_path, 'wb')
+
+    def write(self, block):
+        self._digest.update(block)
+        self._file.write(block)
+        self.size += len(block)
+
+    def commit(self, ext):
+        """Register the written content; returns (blob, created) like store_stream"""
+        self._file.close()
+        try:
+            return _register(self._digest.hexdigest(), self.tmp_path, ext, self.size)
+        finally:
+            self.discard()
+
+    def discard(self):
+        self._file.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+
+def store_stream(stream, ext):
+    """Write an upload stream to the blob store, hashing it in the same pass
+
+    Returns (blob, created). When the same bytes are already stored the
+    temporary copy is discarded and the existing blob's refcount is bumped.
+    """
+    writer = BlobWriter()
+    try:
+        for block in iter(lambda: stream.read(CHUNK_SIZE), b''):
+            writer.write(block)
+    except BaseException:
+        writer.discard()
+        raise
+    return writer.commit(ext)
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def store_file(path, ext, sha256=None):
+    """Move an already written file (e.g. a finished chunked upload) into the blob store"""
+    if sha256 is None:
+        sha256 = file_digest(path)
+    blob, created = _register(sha256, path, ext, os.path.getsize(path))
+    if not created and os.path.exists(path):
+        os.remove(path)
+    return blob, created
+
+
+def _register(digest, source_path, ext, size):
+    """Reference an existing blob or move ``source_path`` into place as a new one"""
+    if Blob.query.filter_by(hash=digest).update(
+            {Blob.refcount: Blob.refcount + 1}, synchronize_session=False):
+        return db.session.get(Blob, digest), False
+
+    key = storage.blob_key(digest, ext)
+    moved = not storage.backend().exists(key)
+    if moved:
+        storage.backend().put(source_path, key, move=True)
+    blob = Blob(hash=digest, filepath=key, size=size, refcount=1, status=Photo.STATUS_PENDING)
+    try:
+        # 동시에 같은 파일이 업로드된 경우 다른 요청이 먼저 등록했을 수 있음
+        with db.session.begin_nested():
+            db.session.add(blob)
+    except IntegrityError:
+        Blob.query.filter_by(hash=digest).update(
+            {Blob.refcount: Blob.refcount + 1}, synchronize_session=False)
+        winner = db.session.get(Blob, digest)
+        if moved and winner.filepath != key:
+            # 다른 확장자로 먼저 등록됨: 방금 옮긴 사본은 아무도 참조하지 않음
+            storage.backend().delete(key)
+        return winner, False
+    return blob, True
+
+
+def release(photos):
+    """Drop the blob references held by ``photos`` in the current transaction
+
+    Returns what to pass to unlink() once the transaction commits: the files
+    of photos stored before the blob store existed, which own their file
+    directly, and the blobs that may have lost their last reference. Blob
+    rows are left in place at refcount 0 until purge() removes them.
+    """
+    orphaned = []
+    refs = Counter()
+    for photo in photos:
+        if photo.blob_hash:
+            refs[photo.blob_hash] += 1
+        else:
+            orphaned.append(photo.filepath)
+
+    for digest, count in refs.items():
+        Blob.query.filter_by(hash=digest).update(
+            {Blob.refcount: Blob.refcount - count}, synchronize_session=False)
+    return orphaned, list(refs)
+
+
+def unlink(released):
+    """Remove what release() freed, after its transaction committed"""
+    paths, digests = released
+    for path in paths:
+        try:
+            storage.delete(path)
+        except Exception as e:
+            app.logger.error(f"Error removing file {path}: {e}")
+    if digests:
+        try:
+            purge(digests)
+        except Exception as e:
+            # 남은 블롭은 삭제 작업(reaper)이 다시 정리
+            db.session.rollback()
+            app.logger.error(f"Error purging blobs: {e}")
+
+
+def purge(digests=None, limit=None):
+    """Delete unreferenced blobs, row and file together, and commit
+
+    Each blob is removed by a conditional DELETE that keeps the row locked
+    (the whole database on SQLite) until its file is gone. A concurrent
+    upload of the same bytes therefore either revives the row first, and
+    the file stays, or waits and then finds neither row nor file and stores
+    the content again. A blob whose file cannot be removed keeps its row for
+    the next run. Returns the number of blobs removed.
+    """
+    query = db.session.query(Blob.hash, Blob.filepath).filter(Blob.refcount <= 0)
+    if digests is not None:
+        query = query.filter(Blob.hash.in_(list(digests)))
+    removed = 0
+    for digest, filepath in query.order_by(Blob.hash).limit(limit).all():
+        try:
+            with db.session.begin_nested():
+                # 조회 이후 다시 참조되었으면 건너뜀
+                if Blob.query.filter(Blob.hash == digest, Blob.refcount <= 0).delete(synchronize_session=False):
+                    storage.delete(filepath)
+                    removed += 1
+        except Exception as e:
+            app.logger.error(f"Error removing blob {digest[:12]} ({filepath}): {e}")
+    db.session.commit()
+    return removed
+
+
+def discard_uncommitted(created):
+    """Remove the files of new blobs whose transaction was rolled back, and commit
+
+    ``created`` holds the ``(hash, filepath)`` of blobs inserted by the
+    rolled-back transaction; their files were already moved into the store.
+    Each hash is claimed with a placeholder row at refcount 0 and removed by
+    purge(), so a concurrent upload that registered the same bytes in the
+    meantime keeps its file.
+    """
+    claimed = []
+    for digest, filepath in created:
+        try:
+            with db.session.begin_nested():
+                db.session.add(Blob(hash=digest, filepath=filepath, size=0, refcount=0))
+            claimed.append(digest)
+        except IntegrityError:
+            # 그 사이 다른 업로드가 같은 내용을 등록함: 파일 유지
+            pass
+    if claimed:
+        purge(claimed)
+
+
+def _copy_into_store(path, digest=None):
+    """Copy a file recorded by path into the storage backend (runs on the thread pool)
+
+    Returns (path, digest, key, error). The source is left in place; it is
+    removed only after the rows pointing at it have been committed.
+    """
+    try:
+        if digest is None:
+            digest = file_digest(path)
+        key = storage.blob_key(digest, os.path.splitext(path)[1])
+        if not storage.backend().exists(key):
+            storage.backend().put(path, key)
+        return path, digest, key, None
+    except Exception as e:
+        return path, digest, None, str(e)
+
+
+def _remove_sources(moved):
+    for path, key in moved:
+        # 기존 블롭 폴더가 곧 저장소 루트인 경우 원본이 이미 제자리에 있음
+        if not storage.backend().stores(key, path):
+            storage.delete(path)
+
+
+@app.cli.command('migrate-storage')
+@click.option('--workers', type=int, default=8, show_default=True, help='Parallel copy threads')
+@click.option('--batch-size', type=int, default=200, show_default=True)
+@click.option('--source-root', type=click.Path(exists=True, file_okay=False), default=None,
+              help='First copy every stored key from this local store (e.g. moving to S3 or another disk)')
+def migrate_storage(workers, batch_size, source_root):
+    """Move originals into the configured storage backend and record keys instead of paths
+
+    Photos uploaded before the blob store (one file per photo under
+    uploads/<project_id>) become deduplicated blobs; blobs recorded by path get
+    their key. Files are copied in parallel, rows are switched per batch and
+    old files are removed only after the batch commits, so the command can be
+    interrupted and run again.
+    """
+    backend = storage.backend()
+    copied = moved_blobs = moved_photos = failed = 0
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        if source_root:
+            source = storage.LocalStorage(source_root)
+
+            def copy(key):
+                if not backend.exists(key):
+                    backend.put(source.path(key), key)
+                    return 1
+                return 0
+
+            keys = [key for (key,) in db.session.query(Blob.filepath) if storage.is_key(key)]
+            for start in range(0, len(keys), batch_size):
+                copied += sum(pool.map(copy, keys[start:start + batch_size]))
+            click.echo(f"Copied {copied} stored files from {source_root}")
+
+        # 1) 경로로 기록된 블롭
+        last_hash = ''
+        while True:
+            rows = db.session.query(Blob.hash, Blob.filepath).filter(Blob.hash > last_hash).order_by(
+                Blob.hash).limit(batch_size).all()
+            if not rows:
+                break
+            last_hash = rows[-1].hash
+            jobs = [(filepath, digest) for digest, filepath in rows if not storage.is_key(filepath)]
+            moved = []
+            for path, digest, key, error in pool.map(lambda job: _copy_into_store(*job), jobs):
+                if error:
+                    failed += 1
+                    click.echo(f"  {path}: {error}", err=True)
+                    continue
+                Blob.query.filter_by(hash=digest).update({Blob.filepath: key}, synchronize_session=False)
+                Photo.query.filter_by(blob_hash=digest).update({Photo.filepath: key}, synchronize_session=False)
+                moved.append((path, key))
+            db.session.commit()
+            _remove_sources(moved)
+            moved_blobs += len(moved)
+
+        # 2) 블롭 저장소 이전에 올라온 사진 (파일을 직접 소유)
+        last_id = 0
+        while True:
+            rows = db.session.query(Photo.id, Photo.filepath).filter(
+                Photo.blob_hash.is_(None), Photo.id > last_id).order_by(Photo.id).limit(batch_size).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+            moved = []
+            for (photo_id, _), (path, digest, key, error) in zip(
+                    rows, pool.map(lambda row: _copy_into_store(row.filepath), rows)):
+                if error:
+                    failed += 1
+                    click.echo(f"  {path}: {error}", err=True)
+                    continue
+                photo = db.session.get(Photo, photo_id)
+                blob = db.session.get(Blob, digest)
+                if blob is None:
+                    blob = Blob(hash=digest, filepath=key, size=photo.file_size or os.path.getsize(path),
+                                refcount=1, status=photo.status)
+                    db.session.add(blob)
+                    db.session.flush()
+                else:
+                    blob.refcount += 1
+                photo.blob_hash = digest
+                photo.filepath = key
+                moved.append((path, key))
+            db.session.commit()
+            _remove_sources(moved)
+            moved_photos += len(moved)
+
+    click.echo(f"Moved {moved_blobs} blobs and {moved_photos} legacy photos into {app.config['STORAGE_BACKEND']} "
+               f"storage, failed: {failed}")
@@ -0,0 +1,236 @@
+"""Server-side import of whole ZIP archives and folders into a project.
+
+Members are streamed one by one (never extracted to disk as a tree) into the
+blob store's temporary area by a small thread pool, which also sniffs the
+format and parses EXIF headers. The request thread registers the staged
+files, inserts Photo rows in batches of BULK_IMPORT_BATCH_SIZE (one commit
+each) and hands new blobs to the ingest process pool for compression.
+"""
+import os
+import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import click
+from flask import request, jsonify
+from app import app, db
+from models import Photo, Project
+import blobs
+import ingest
+import project_cache
+import project_stats
+import routes
+import streaming_uploads
+
+READ_SIZE = 256 * 1024
+UTF8_FLAG = 0x800
+
+
+class ImportReport:
+    """Running totals of one import, returned to the caller as a dict"""
+
+    def __init__(self):
+        self.imported = 0
+        self.reused = 0  # 이미 저장된 내용과 같은 파일 (압축 생략)
+        self.errors = []
+
+    def error(self, filename, reason):
+        self.errors.append({'filename': filename, 'error': reason})
+
+    def to_dict(self):
+        return {'imported': self.imported, 'reused': self.reused, 'errors': self.errors}
+
+
+def _wanted(name):
+    """Skip directories, hidden files, macOS resource forks and unsupported types"""
+    basename = os.path.basename(name)
+    return (basename and not basename.startswith('.') and '__MACOSX/' not in name
+            and routes.allowed_file(basename))
+
+
+def _member_name(info):
+    """Decode a member name; Korean Windows tools write cp949 without the UTF-8 flag"""
+    name = info.filename
+    if not info.flag_bits & UTF8_FLAG:
+        try:
+            name = name.encode('cp437').decode('cp949')
+        except (UnicodeEncodeError, UnicodeDecodeError):
+            pass
+    return name
+
+
+def zip_sources(archive):
+    """(filename, opener) for every importable member of an open ZipFile"""
+    for info in archive.infolist():
+        name = _member_name(info)
+        if not info.is_dir() and _wanted(name):
+            yield os.path.basename(name), lambda info=info: archive.open(info)
+
+
+def folder_sources(root, recursive=True):
+    """(filename, opener) for every importable file under ``root``, in path order"""
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith('.')) if recursive else []
+        for filename in sorted(filenames):
+            path = os.path.join(dirpath, filename)
+            if _wanted(path):
+                yield filename, lambda path=path: open(path, 'rb')
+
+
+def _stage(filename, opener, max_bytes):
+    """Copy one source into the blob store's temporary area (runs on the thread pool)"""
+    part = streaming_uploads.UploadPart(filename)
+    try:
+        with opener() as source:
+            for block in iter(lambda: source.read(READ_SIZE), b''):
+                part.write(block, max_bytes)
+                if part.error:
+                    break
+        part.finish()
+    except Exception as e:
+        app.logger.error(f"Error reading {filename} for import: {e}")
+        part.reject('파일을 읽을 수 없습니다.')
+    return part
+
+
+class _Batch:
+    """Photos registered since the last commit"""
+
+    def __init__(self, project_id, default_description, report):
+        self.project_id = project_id
+        self.default_description = default_description
+        self.report = report
+        self.names = {name for (name,) in db.session.query(Photo.filename).filter_by(project_id=project_id)}
+        self.added = []
+        self.pending = []
+        self.reused_blobs = []
+        self.created_blobs = []  # 커밋 전에 저장소로 옮겨진 새 블롭 (hash, filepath)
+
+    def add(self, part):
+        if part.error:
+            self.report.error(part.filename, part.error)
+            return
+        try:
+            photo, created = routes.add_uploaded_photo(
+                self.project_id, part.filename, part.commit, self.default_description,
+                dict(part.metadata or {}, original_size=part.size), existing_names=self.names)
+        except Exception as e:
+            app.logger.error(f"Error importing {part.filename}: {e}")
+            part.discard()
+            self.report.error(part.filename, '사진 등록에 실패했습니다.')
+            return
+        self.added.append(photo)
+        if created:
+            self.pending.append(photo)
+            self.created_blobs.append((photo.blob_hash, photo.filepath))
+        else:
+            self.report.reused += 1
+            if photo.status == Photo.STATUS_PENDING:
+                self.reused_blobs.append(photo.blob_hash)
+
+    def flush(self):
+        """Insert the batch in one transaction and queue its new blobs for compression"""
+        if not self.added:
+            return
+        project_stats.record_added(self.project_id, self.added)
+        db.session.commit()
+        self.created_blobs = []
+        ingest.enqueue(self.pending)
+        ingest.catch_up(self.reused_blobs)
+        self.report.imported += len(self.added)
+        self.added, self.pending, self.reused_blobs = [], [], []
+
+
+def import_sources(project_id, sources, default_description=None, progress=None):
+    """Import ``(filename, opener)`` sources into a project; returns an ImportReport
+
+    Staging runs a bounded window ahead of registration so memory and
+    temporary disk use stay flat however large the archive is. ``progress``
+    is called with the report after every committed batch.
+    """
+    batch_size = app.config['BULK_IMPORT_BATCH_SIZE']
+    max_bytes = app.config['UPLOAD_MAX_FILE_BYTES']
+    report = ImportReport()
+    batch = _Batch(project_id, default_description, report)
+    in_flight = deque()
+
+    def register_next():
+        batch.add(in_flight.popleft().result())
+        if len(batch.added) >= batch_size:
+            batch.flush()
+            if progress:
+                progress(report)
+
+    with ThreadPoolExecutor(max_workers=app.config['BULK_IMPORT_WORKERS'], thread_name_prefix='import') as pool:
+        try:
+            for filename, opener in sources:
+                in_flight.append(pool.submit(_stage, filename, opener, max_bytes))
+                if len(in_flight) >= batch_size:
+                    register_next()
+            while in_flight:
+                register_next()
+            batch.flush()
+        except BaseException:
+            db.session.rollback()
+            # 롤백된 배치가 저장소로 옮긴 새 블롭 파일과 등록되지 않은 임시 파일 정리
+            blobs.discard_uncommitted(batch.created_blobs)
+            for future in in_flight:
+                future.result().discard()
+            raise
+    if progress:
+        progress(report)
+    return report
+
+
+@app.route('/import_archive/<int:project_id>', methods=['POST'])
+def import_archive(project_id):
+    """ZIP 파일 하나로 여러 사진을 한 번에 등록"""
+    project_cache.get_project_or_404(project_id)
+    # 일반 업로드보다 큰 요청 허용 (사진은 멤버 단위로 UPLOAD_MAX_FILE_BYTES 적용)
+    request.max_content_length = app.config['BULK_IMPORT_MAX_BYTES']
+
+    upload = request.files.get('archive')
+    if upload is None or not upload.filename:
+        return jsonify({'success': False, 'error': 'ZIP 파일이 선택되지 않았습니다.'}), 400
+    default_description = request.form.get('default_description', '').strip() or None
+
+    try:
+        with zipfile.ZipFile(upload.stream) as archive:
+            report = import_sources(project_id, zip_sources(archive), default_description,
+                                    progress=lambda r: app.logger.info(
+                                        f"Import into project {project_id}: {r.imported} photos, {len(r.errors)} errors"))
+    except zipfile.BadZipFile:
+        return jsonify({'success': False, 'error': '올바른 ZIP 파일이 아닙니다.'}), 400
+    except Exception as e:
+        app.logger.error(f"Error importing archive into project {project_id}: {e}")
+        return jsonify({'success': False, 'error': 'ZIP 가져오기 중 오류가 발생했습니다.'}), 500
+
+    return jsonify({'success': True, **report.to_dict()})
+
+
+@app.cli.command('import-photos')
+@click.argument('project_id', type=int)
+@click.argument('path', type=click.Path(exists=True))
+@click.option('--description', default=None, help='Description for photos whose filename carries none')
+@click.option('--recursive/--no-recursive', default=True, show_default=True, help='Descend into subfolders')
+def import_photos(project_id, path, description, recursive):
+    """Import a local folder or ZIP archive of photos into a project"""
+    if db.session.get(Project, project_id) is None:
+        raise click.ClickException(f"Project {project_id} does not exist")
+
+    def progress(report):
+        click.echo(f"  {report.imported} imported, {len(report.errors)} errors")
+
+    if os.path.isdir(path):
+        report = import_sources(project_id, folder_sources(path, recursive), description, progress)
+    else:
+        try:
+            with zipfile.ZipFile(path) as archive:
+                report = import_sources(project_id, zip_sources(archive), description, progress)
+        except zipfile.BadZipFile:
+            raise click.ClickException(f"{path} is neither a folder nor a ZIP archive")
+
+    for error in report.errors:
+        click.echo(f"  skipped {error['filename']}: {error['error']}", err=True)
+    # 백그라운드 압축이 끝날 때까지 대기
+    ingest.shutdown()
+    click.echo(f"Imported {report.imported} photos ({report.reused} already stored), errors: {len(report.errors)}")
@@ -0,0 +1,175 @@
+import os
+import re
+import shutil
+import hashlib
+import uuid
+from datetime import datetime, timedelta
+import click
+from app import app, db
+from models import UploadSession
+import imaging
+
+INCOMING_DIRNAME = '.incoming'
+SNIFF_BYTES = 16
+SHA256_PATTERN = re.compile(r'^[0-9a-fA-F]{64}$')
+
+
+class ChunkError(ValueError):
+    """Raised when a chunk is rejected; the message is safe to show to clients"""
+
+
+def is_sha256(value):
+    """True for a hex-encoded SHA-256 digest"""
+    return isinstance(value, str) and bool(SHA256_PATTERN.match(value))
+
+
+def session_dir(upload_id):
+    return os.path.join(app.config['UPLOAD_FOLDER'], INCOMING_DIRNAME, upload_id)
+
+
+def data_path(upload_id):
+    return os.path.join(session_dir(upload_id), 'data.part')
+
+
+def _marker_dir(upload_id):
+    return os.path.join(session_dir(upload_id), 'chunks')
+
+
+def create_session(project_id, filename, total_size, chunk_size=None, sha256=None, description=None):
+    """Create an upload session and preallocate its data file"""
+    chunk_size = chunk_size or app.config['UPLOAD_CHUNK_SIZE']
+    upload = UploadSession(
+        id=uuid.uuid4().hex,
+        project_id=project_id,
+        filename=filename,
+        total_size=total_size,
+        chunk_size=chunk_size,
+        sha256=sha256.lower() if sha256 else None,
+        description=description,
+    )
+    os.makedirs(_marker_dir(upload.id), exist_ok=True)
+    with open(data_path(upload.id), 'wb') as f:
+        f.truncate(total_size)
+    db.session.add(upload)
+    db.session.commit()
+    return upload
+
+
+def received_chunks(upload):
+    """Indexes of chunks already written and verified"""
+    try:
+        names = os.listdir(_marker_dir(upload.id))
+    except FileNotFoundError:
+        return []
+    return sorted(int(name) for name in names if name.isdigit())
+
+
+def contiguous_offset(upload, received):
+    """Bytes received without gaps from the start of the file (resume point)"""
+    expected = 0
+    for index in received:
+        if index != expected:
+            break
+        expected += 1
+    return min(expected * upload.chunk_size, upload.total_size)
+
+
+def write_chunk(upload, index, data, checksum):
+    """Verify and write one chunk at its offset
+
+    Chunks are independent, so several may be written concurrently from
+    parallel requests. A marker file is created only after the bytes are on
+    disk, which makes retries of the same chunk idempotent.
+    """
+    if index < 0 or index >= upload.chunk_count:
+        raise ChunkError('잘못된 청크 번호입니다.')
+
+    offset = index * upload.chunk_size
+    expected_length = min(upload.chunk_size, upload.total_size - offset)
+    if len(data) != expected_length:
+        raise ChunkError(f'청크 크기가 올바르지 않습니다. (expected {expected_length}, got {len(data)})')
+
+    if not checksum or hashlib.sha256(data).hexdigest() != checksum.lower():
+        raise ChunkError('청크 체크섬이 일치하지 않습니다.')
+
+    fd = os.open(data_path(upload.id), os.O_WRONLY)
+    try:
+        view = memoryview(data)
+        written = 0
+        while written < len(view):
+            written += os.pwrite(fd, view[written:], offset + written)
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+    # 완료 표시 (빈 파일)
+    open(os.path.join(_marker_dir(upload.id), str(index)), 'wb').close()
+
+
+def verify_complete(upload):
+    """Check that every chunk arrived and, if provided, the whole-file checksum"""
+    missing = sorted(set(range(upload.chunk_count)) - set(received_chunks(upload)))
+    if missing:
+        raise ChunkError(f'누락된 청크가 있습니다: {missing[:20]}')
+
+    if upload.sha256:
+        digest = hashlib.sha256()
+        with open(data_path(upload.id), 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        if digest.hexdigest() != upload.sha256:
+            raise ChunkError('파일 체크섬이 일치하지 않습니다.')
+
+
+def read_image_metadata(upload):
+    """Sniff the assembled file and parse its header, as form uploads do
+
+    Raises ChunkError if the file is not an accepted image or its header
+    cannot be parsed.
+    """
+    path = data_path(upload.id)
+    with open(path, 'rb') as f:
+        head = f.read(SNIFF_BYTES)
+    if imaging.sniff_format(head) is None:
+        raise ChunkError('이미지 파일이 아닙니다.')
+    metadata = imaging.read_metadata(path)
+    if metadata is None:
+        raise ChunkError('손상된 이미지 파일입니다.')
+    return metadata
+
+
+def claim(upload):
+    """Mark the session as being finalized; False if another request already did
+
+    The conditional update is committed at once so concurrent finalize
+    calls for the same session see it and back off.
+    """
+    claimed = UploadSession.query.filter_by(id=upload.id, status=UploadSession.STATUS_OPEN).update(
+        {UploadSession.status: UploadSession.STATUS_FINALIZING}, synchronize_session=False)
+    db.session.commit()
+    return claimed == 1
+
+
+def unclaim(upload_id):
+    """Reopen a session whose finalization failed so it can be retried"""
+    UploadSession.query.filter_by(id=upload_id).update(
+        {UploadSession.status: UploadSession.STATUS_OPEN}, synchronize_session=False)
+    db.session.commit()
+
+
+def discard(upload):
+    """Remove the session's temporary files and its database row"""
+    shutil.rmtree(session_dir(upload.id), ignore_errors=True)
+    db.session.delete(upload)
+
+
+@app.cli.command('cleanup-uploads')
+@click.option('--max-age-hours', type=int, default=48, help='Remove sessions older than this')
+def cleanup_uploads(max_age_hours):
+    """Remove abandoned chunked upload sessions"""
+    cutoff = datetime.utcnow() - timedelta(hours=max_age_hours)
+    stale = UploadSession.query.filter(UploadSession.created_at < cutoff).all()
+    for upload in stale:
+        discard(upload)
+    db.session.commit()
+    click.echo(f"Removed {len(stale)} abandoned upload sessions")
@@ -0,0 +1,108 @@
+"""Configuration profiles, selected by APP_ENV (or FLASK_ENV): development or production.
+
+Settings are read from the environment once, when this module is imported.
+"""
+import os
+
+
+def profile_name():
+    return os.environ.get('APP_ENV') or os.environ.get('FLASK_ENV') or 'development'
+
+
+def _storage_accel_prefix(storage_root, upload_folder, accel_prefix):
+    """Default accel location of the storage root: below the uploads location if the root is inside it"""
+    relative = os.path.relpath(os.path.abspath(storage_root), os.path.abspath(upload_folder))
+    if relative.startswith(os.pardir):
+        return '/protected-blobs/'
+    return f"{accel_prefix.rstrip('/')}/{relative.replace(os.sep, '/')}/"
+
+
+class Config:
+    SECRET_KEY = os.environ.get("SESSION_SECRET", "dev-secret-key-change-in-production")
+    LOG_LEVEL = 'INFO'
+    AUTO_MIGRATE = False  # True이면 시작할 때 스키마 적용 (운영에서는 flask migrate-db로 별도 실행)
+    STARTUP_BUDGET_MS = 1500  # flask check-startup 기준 (프로세스 시작 + create_app)
+
+    # Configure the database
+    SQLALCHEMY_DATABASE_URI = os.environ.get("DATABASE_URL")
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        "pool_recycle": 300,
+        "pool_pre_ping": True,
+    }
+
+    # Configure upload settings
+    MAX_CONTENT_LENGTH = 100 * 1024 * 1024  # 100MB max request size
+    UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER', 'uploads')
+    UPLOAD_MAX_FILE_BYTES = 50 * 1024 * 1024  # 일반 업로드 파일당 최대 크기 (대용량은 분할 업로드)
+    BLOB_FOLDER = os.path.join(UPLOAD_FOLDER, 'blobs')  # 내용 주소 기반 저장소
+    # 원본 저장소: 'local' (STORAGE_ROOT 아래 해시 분산 디렉터리) 또는 's3' (S3 호환 버킷, boto3 필요)
+    STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'local')
+    STORAGE_ROOT = os.environ.get('STORAGE_ROOT', BLOB_FOLDER)
+    STORAGE_CACHE_FOLDER = os.environ.get(  # S3 사용 시 이미지 처리용 로컬 사본
+        'STORAGE_CACHE_FOLDER', os.path.join(UPLOAD_FOLDER, '.storage-cache'))
+    S3_BUCKET = os.environ.get('S3_BUCKET')
+    S3_PREFIX = os.environ.get('S3_PREFIX', '')
+    S3_ENDPOINT_URL = os.environ.get('S3_ENDPOINT_URL')  # MinIO 등 S3 호환 서버
+    STORAGE_URL_EXPIRES = 3600  # S3 원본 다운로드 서명 URL 유효 시간(초)
+    PHOTOS_PER_PAGE = 60
+    PROJECT_CACHE_TTL = 5  # 프로젝트 캐시를 DB 확인 없이 사용하는 시간(초), 다른 워커의 변경은 최대 이만큼 늦게 반영
+    UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024  # 분할 업로드 기본 청크 크기
+    CHUNKED_UPLOAD_MAX_BYTES = 2 * 1024 * 1024 * 1024  # 분할 업로드 파일당 최대 크기
+    BULK_IMPORT_MAX_BYTES = int(os.environ.get('BULK_IMPORT_MAX_BYTES', 4 * 1024 * 1024 * 1024))  # ZIP 가져오기 요청 최대 크기
+    BULK_IMPORT_BATCH_SIZE = 200  # 한 트랜잭션에 등록할 사진 수
+    BULK_IMPORT_WORKERS = 4  # ZIP/폴더 읽기 스레드 수
+
+    # Image processing settings
+    INGEST_WORKERS = int(os.environ.get('INGEST_WORKERS', 0)) or None  # None = 모든 코어 사용
+    RENDITION_CACHE_MAX_BYTES = int(os.environ.get('RENDITION_CACHE_MAX_BYTES', 2 * 1024 * 1024 * 1024))
+    # 렌디션 포맷 선호 순서 (Accept 헤더에 명시된 첫 번째 포맷 사용, 그 외에는 JPEG)
+    RENDITION_FORMATS = ['avif', 'webp', 'jpeg']
+    RENDITION_ENCODE_OPTIONS = {
+        'jpeg': {'quality': 82, 'optimize': True},
+        'webp': {'quality': 80, 'method': 4},
+        'avif': {'quality': 60, 'speed': 8},
+    }
+    # 호출 위치별 디코딩 프로필 (imaging.DECODE_PROFILES: fast / balanced / quality)
+    IMAGE_PROFILES = {
+        'ingest': 'balanced',
+        'thumb': 'fast',
+        'preview': 'balanced',
+        'album': 'balanced',
+    }
+    SPRITE_TILE_SIZE = 160  # 스프라이트 셀 크기 (정사각형, px)
+    SPRITE_COLUMNS = 10
+    DUPLICATE_MAX_DISTANCE = 6  # 유사 사진으로 볼 지각 해시 최대 해밍 거리 (64비트 중)
+    ALBUM_DPI = 150  # 준공사진첩 PDF 인쇄 해상도
+    ALBUM_PHOTOS_PER_PAGE = 2
+    ALBUM_FONT_PATH = os.environ.get('ALBUM_FONT_PATH')  # 한글 캡션용 TTF (예: NanumGothic.ttf)
+    ALBUM_BUILD_WAIT = 10  # 준공사진첩 다운로드 요청이 백그라운드 생성을 기다리는 최대 시간(초)
+    ARCHIVE_SNAPSHOTS = True  # 전체 다운로드 ZIP을 프로젝트 revision별로 캐시
+    ARCHIVE_CACHE_MAX_BYTES = int(os.environ.get('ARCHIVE_CACHE_MAX_BYTES', 20 * 1024 * 1024 * 1024))
+    DELETION_BATCH_SIZE = 500
+    DELETION_WORKERS = 8  # 파일 삭제 병렬 스레드 수
+    DELETION_MAX_ATTEMPTS = 5
+
+    # 원본 사진 전송 설정
+    PHOTO_CACHE_MAX_AGE = 365 * 24 * 3600  # 처리 완료된 원본은 내용이 바뀌지 않음
+    # 프런트 프록시에 파일 전송 위임: '' (직접 전송), 'x-accel-redirect' (nginx), 'x-sendfile' (Apache/lighttpd)
+    SENDFILE_MODE = os.environ.get('SENDFILE_MODE', '')
+    SENDFILE_ACCEL_PREFIX = os.environ.get('SENDFILE_ACCEL_PREFIX', '/protected-uploads/')  # UPLOAD_FOLDER에 매핑된 nginx internal location
+    # STORAGE_ROOT(local 저장소)에 매핑된 internal location
+    SENDFILE_STORAGE_PREFIX = os.environ.get('SENDFILE_STORAGE_PREFIX') or _storage_accel_prefix(
+        STORAGE_ROOT, UPLOAD_FOLDER, SENDFILE_ACCEL_PREFIX)
+    USE_X_SENDFILE = SENDFILE_MODE == 'x-sendfile'
+
+
+class DevelopmentConfig(Config):
+    LOG_LEVEL = 'DEBUG'
+    AUTO_MIGRATE = True  # 로컬 실행 시 별도 명령 없이 테이블 생성
+
+
+class ProductionConfig(Config):
+    PREFERRED_URL_SCHEME = 'https'
+
+
+PROFILES = {
+    'development': DevelopmentConfig,
+    'production': ProductionConfig,
+}
@@ -0,0 +1,161 @@
+import os
+import shutil
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+import click
+from sqlalchemy import case, insert, select
+from app import app, db
+from models import Blob, Photo, PendingDeletion, Project, UploadSession
+import archives
+import blobs
+import chunked_uploads
+import renditions
+import storage
+
+_reaper_lock = threading.Lock()
+_reaper_thread = None
+
+
+def queue_project_photos(project_id):
+    """Delete every photo row of a project and queue its files for the reaper
+
+    Runs as two set-based statements in the caller's transaction, so rows and
+    the cleanup queue can never get out of sync.
+    """
+    db.session.execute(
+        insert(PendingDeletion).from_select(
+            ['blob_hash', 'path'],
+            select(
+                Photo.blob_hash,
+                # 블롭 저장소 이전에 올라온 사진은 파일을 직접 소유
+                case((Photo.blob_hash.is_(None), Photo.filepath), else_=None),
+            ).where(Photo.project_id == project_id)
+        )
+    )
+    Photo.query.filter_by(project_id=project_id).delete(synchronize_session=False)
+    queue_path(os.path.join(app.config['UPLOAD_FOLDER'], str(project_id), renditions.RENDITION_DIRNAME), is_dir=True)
+    queue_path(archives.archive_dir(project_id), is_dir=True)
+
+
+def queue_project(project_id):
+    """Delete a project with its photos and upload sessions, queueing all files"""
+    queue_project_photos(project_id)
+    for (upload_id,) in db.session.query(UploadSession.id).filter_by(project_id=project_id):
+        queue_path(chunked_uploads.session_dir(upload_id), is_dir=True)
+    UploadSession.query.filter_by(project_id=project_id).delete(synchronize_session=False)
+    Project.query.filter_by(id=project_id).delete(synchronize_session=False)
+    queue_path(os.path.join(app.config['UPLOAD_FOLDER'], str(project_id)), is_dir=True)
+
+
+def queue_path(path, is_dir=False):
+    db.session.add(PendingDeletion(path=path, is_dir=is_dir))
+
+
+def _release_blobs(entries):
+    """Drop the blob references held by queued entries (unreferenced blobs are purged afterwards)"""
+    refs = Counter(entry.blob_hash for entry in entries)
+    for digest, count in refs.items():
+        Blob.query.filter_by(hash=digest).update(
+            {Blob.refcount: Blob.refcount - count}, synchronize_session=False)
+    for entry in entries:
+        db.session.delete(entry)
+
+
+def _remove(entry_id, path, is_dir):
+    """Remove one file or directory; returns (entry_id, error or None)"""
+    try:
+        if is_dir:
+            shutil.rmtree(path)
+        else:
+            storage.delete(path)
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        return entry_id, str(e)
+    return entry_id, None
+
+
+def reap_once():
+    """Process one batch of the queue
+
+    Returns (handled, completed): entries looked at and entries finished.
+    """
+    batch_size = app.config['DELETION_BATCH_SIZE']
+
+    blob_entries = PendingDeletion.query.filter(PendingDeletion.blob_hash.isnot(None)).order_by(
+        PendingDeletion.id).limit(batch_size).all()
+    if blob_entries:
+        _release_blobs(blob_entries)
+        db.session.commit()
+    # 참조가 0이 된 블롭 (요청 처리 중 정리하지 못하고 남은 것 포함)
+    purged = blobs.purge(limit=batch_size)
+
+    path_entries = PendingDeletion.query.filter(
+        PendingDeletion.path.isnot(None),
+        PendingDeletion.attempts < app.config['DELETION_MAX_ATTEMPTS'],
+    ).order_by(PendingDeletion.is_dir, PendingDeletion.id).limit(batch_size).all()
+    if not path_entries:
+        return len(blob_entries) + purged, len(blob_entries) + purged
+
+    # 파일 삭제는 I/O 대기 위주이므로 스레드로 병렬 처리
+    jobs = [(entry.id, entry.path, entry.is_dir) for entry in path_entries]
+    with ThreadPoolExecutor(max_workers=app.config['DELETION_WORKERS']) as pool:
+        results = dict(pool.map(lambda job: _remove(*job), jobs))
+
+    completed = len(blob_entries) + purged
+    for entry in path_entries:
+        error = results[entry.id]
+        if error is None:
+            db.session.delete(entry)
+            completed += 1
+        else:
+            entry.attempts += 1
+            entry.last_error = error[:500]
+            app.logger.error(f"Error removing {entry.path} (attempt {entry.attempts}): {error}")
+    db.session.commit()
+    return len(blob_entries) + purged + len(path_entries), completed
+
+
+def reap_all():
+    """Drain the queue; entries that keep failing are left for the next run"""
+    total = 0
+    while True:
+        handled, completed = reap_once()
+        total += completed
+        if not handled or not completed:
+            return total
+
+
+def _run_reaper():
+    global _reaper_thread
+    try:
+        with app.app_context():
+            reap_all()
+    except Exception as e:
+        app.logger.error(f"Deletion reaper failed: {e}")
+    finally:
+        with _reaper_lock:
+            _reaper_thread = None
+
+
+def wake():
+    """Start the background reaper thread unless it is already running"""
+    global _reaper_thread
+    with _reaper_lock:
+        if _reaper_thread is None:
+            _reaper_thread = threading.Thread(target=_run_reaper, name='deletion-reaper', daemon=True)
+            _reaper_thread.start()
+
+
+@app.cli.command('reap-deletions')
+@click.option('--retry-failed', is_flag=True, help='Reset the attempt counter of failed entries first')
+def reap_deletions(retry_failed):
+    """Remove files queued by bulk deletes"""
+    if retry_failed:
+        PendingDeletion.query.filter(PendingDeletion.path.isnot(None)).update(
+            {PendingDeletion.attempts: 0}, synchronize_session=False)
+        db.session.commit()
+    handled = reap_all()
+    remaining = PendingDeletion.query.count()
+    click.echo(f"Processed {handled} queued deletions, remaining: {remaining}")
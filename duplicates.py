@@ -0,0 +1,178 @@
+"""Near-duplicate detection over the perceptual hashes computed at ingest.
+
+Each project gets an in-memory BK-tree over its photo hashes, rebuilt only
+when the project's photo set changes. A radius lookup visits only the
+subtrees whose distance band can contain a match, so listing a project's
+duplicate clusters costs about n small lookups instead of n^2 comparisons.
+"""
+import threading
+import click
+from sqlalchemy import func
+from app import app, db
+from models import Photo
+import imaging
+import ingest
+import storage
+
+_SIGN_BIT = 1 << 63
+
+
+def to_signed(value):
+    """Unsigned 64-bit hash -> signed BIGINT column value"""
+    return value - (1 << 64) if value >= _SIGN_BIT else value
+
+
+def to_unsigned(value):
+    return value + (1 << 64) if value < 0 else value
+
+
+def distance(a, b):
+    return (a ^ b).bit_count()
+
+
+class BKTree:
+    """Burkhard-Keller tree keyed by Hamming distance
+
+    Photos with identical hashes share one node.
+    """
+
+    def __init__(self):
+        self.root = None  # [hash, [photo ids], {distance: child}]
+        self.size = 0
+
+    def add(self, value, photo_id):
+        self.size += 1
+        if self.root is None:
+            self.root = [value, [photo_id], {}]
+            return
+        node = self.root
+        while True:
+            d = distance(value, node[0])
+            if d == 0:
+                node[1].append(photo_id)
+                return
+            child = node[2].get(d)
+            if child is None:
+                node[2][d] = [value, [photo_id], {}]
+                return
+            node = child
+
+    def search(self, value, radius):
+        """(distance, photo_id) pairs within ``radius`` of ``value``"""
+        results = []
+        stack = [self.root] if self.root else []
+        while stack:
+            node = stack.pop()
+            d = distance(value, node[0])
+            if d <= radius:
+                results.extend((d, photo_id) for photo_id in node[1])
+            # 삼각 부등식: |d - k| <= radius 인 자식만 후보
+            for k, child in node[2].items():
+                if d - radius <= k <= d + radius:
+                    stack.append(child)
+        return results
+
+
+_lock = threading.Lock()
+_trees = {}  # project_id -> (signature, hashes, tree)
+
+
+def project_index(project_id):
+    """(hashes by photo id, BK-tree) for a project, cached until its photos change"""
+    signature = db.session.query(
+        func.count(Photo.dhash), func.max(Photo.id), func.sum(Photo.id)
+    ).filter(Photo.project_id == project_id, Photo.dhash.isnot(None)).one()
+    signature = tuple(signature)
+    with _lock:
+        cached = _trees.get(project_id)
+        if cached and cached[0] == signature:
+            return cached[1], cached[2]
+
+    hashes = {}
+    tree = BKTree()
+    for photo_id, value in db.session.query(Photo.id, Photo.dhash).filter(
+            Photo.project_id == project_id, Photo.dhash.isnot(None)).order_by(Photo.id):
+        value = to_unsigned(value)
+        hashes[photo_id] = value
+        tree.add(value, photo_id)
+    with _lock:
+        _trees[project_id] = (signature, hashes, tree)
+    return hashes, tree
+
+
+def similar_to(photo, max_distance=None):
+    """(distance, photo_id) of the photos in the same project that look like ``photo``"""
+    if photo.dhash is None:
+        return []
+    max_distance = app.config['DUPLICATE_MAX_DISTANCE'] if max_distance is None else max_distance
+    _, tree = project_index(photo.project_id)
+    matches = [match for match in tree.search(to_unsigned(photo.dhash), max_distance) if match[1] != photo.id]
+    return sorted(matches)
+
+
+def clusters(project_id, max_distance=None):
+    """Groups of photo ids (two or more) connected by near-duplicate links"""
+    max_distance = app.config['DUPLICATE_MAX_DISTANCE'] if max_distance is None else max_distance
+    hashes, tree = project_index(project_id)
+
+    parent = {photo_id: photo_id for photo_id in hashes}
+
+    def find(photo_id):
+        while parent[photo_id] != photo_id:
+            parent[photo_id] = parent[parent[photo_id]]
+            photo_id = parent[photo_id]
+        return photo_id
+
+    for photo_id, value in hashes.items():
+        for _, other_id in tree.search(value, max_distance):
+            root, other_root = find(photo_id), find(other_id)
+            if root != other_root:
+                parent[max(root, other_root)] = min(root, other_root)
+
+    groups = {}
+    for photo_id in hashes:
+        groups.setdefault(find(photo_id), []).append(photo_id)
+    return sorted((sorted(group) for group in groups.values() if len(group) > 1), key=lambda group: group[0])
+
+
+def best_photo(photos):
+    """The photo to keep from a cluster: highest resolution, then largest original, then oldest"""
+    return max(photos, key=lambda photo: (
+        (photo.original_width or 0) * (photo.original_height or 0),
+        photo.original_size or photo.file_size or 0,
+        -photo.id,
+    ))
+
+
+@app.cli.command('backfill-dhash')
+@click.option('--project-id', type=int, default=None, help='Only process one project')
+@click.option('--batch-size', type=int, default=500, show_default=True)
+def backfill_dhash(project_id, batch_size):
+    """Compute perceptual hashes for photos stored before hashing existed"""
+    query = db.session.query(Photo.id, Photo.filepath).filter(
+        Photo.dhash.is_(None), Photo.status != Photo.STATUS_PENDING).order_by(Photo.id)
+    if project_id is not None:
+        query = query.filter(Photo.project_id == project_id)
+
+    executor = ingest.get_executor()
+    done = failed = 0
+    last_id = 0
+    while True:
+        rows = query.filter(Photo.id > last_id).limit(batch_size).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        paths = {}
+        for photo_id, filepath in rows:
+            paths.setdefault(storage.local_path(filepath), []).append(photo_id)
+
+        # 같은 블롭을 공유하는 사진은 한 번만 디코딩
+        for path, value in executor.map(imaging.dhash_file, list(paths), chunksize=16):
+            if value is None:
+                failed += len(paths[path])
+                continue
+            Photo.query.filter(Photo.id.in_(paths[path])).update(
+                {Photo.dhash: to_signed(value)}, synchronize_session=False)
+            done += len(paths[path])
+        db.session.commit()
+    click.echo(f"Hashed {done} photos, unreadable: {failed}")
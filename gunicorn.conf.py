@@ -1,14 +1,31 @@
 # Gunicorn configuration file
+import os
+
 bind = "0.0.0.0:5000"
-workers = 1
+workers = int(os.environ.get('WEB_CONCURRENCY', 1))
 worker_class = "sync"
 timeout = 300
 keepalive = 2
 max_requests = 1000
 max_requests_jitter = 50
-preload_app = True
-reload = True
+
+# 운영: 마스터에서 앱을 한 번 로드하고 워커는 fork만 하므로 max_requests 재시작 비용이 거의 없음
+# 개발: 코드 변경 시 자동 재시작 (reload는 preload_app과 함께 쓰면 동작하지 않음)
+reload = (os.environ.get('APP_ENV') or os.environ.get('FLASK_ENV') or 'development') == 'development'
+preload_app = not reload
 
 # Large file upload settings
 limit_request_line = 0
-limit_request_field_size = 0
\ No newline at end of file
+limit_request_field_size = 0
+
+
+def post_fork(server, worker):
+    # 마스터에서 앱을 미리 로드한 경우에만 DB 엔진이 있음 (개발 모드는 워커가 fork 후 앱을 로드)
+    if not server.cfg.preload_app:
+        return
+    from app import app, db
+    if app.current is None:
+        return
+    # 마스터에서 만들어진 DB 연결이 있으면 워커끼리 공유하지 않도록 버림
+    with app.current.app_context():
+        db.engine.dispose(close=False)
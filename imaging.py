@@ -0,0 +1,329 @@
+"""Image processing helpers.
+
+This module only depends on Pillow so it can be imported by ingest worker
+processes without pulling in the Flask app or a database connection. Pillow
+itself is imported by the functions that need it, so importing this module
+costs a web process nothing at startup.
+"""
+import io
+import os
+import math
+import time
+import logging
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+
+def flatten_to_rgb(img):
+    """Convert any image mode to RGB, compositing transparency onto white"""
+    from PIL import Image
+    if img.mode in ('RGBA', 'LA', 'P'):
+        # 투명도가 있는 이미지는 흰색 배경으로 변환
+        if img.mode == 'P':
+            img = img.convert('RGBA')
+        background = Image.new('RGB', img.size, (255, 255, 255))
+        background.paste(img, mask=img.split()[-1] if img.mode in ('RGBA', 'LA') else None)
+        return background
+    if img.mode != 'RGB':
+        return img.convert('RGB')
+    return img
+
+
+# 디코딩 속도/품질 프로필
+#   reducing_gap: JPEG는 목표 크기의 reducing_gap 배까지 DCT 단계에서 축소 디코딩
+#                 (None이면 항상 원본 해상도로 디코딩)
+#   resample: 최종 리샘플링 필터 (Image.Resampling 이름)
+DECODE_PROFILES = {
+    'fast': {'reducing_gap': 1.5, 'resample': 'BICUBIC'},
+    'balanced': {'reducing_gap': 2.0, 'resample': 'LANCZOS'},
+    'quality': {'reducing_gap': None, 'resample': 'LANCZOS'},
+}
+
+ROTATIONS = {3: 180, 6: 270, 8: 90}  # EXIF orientation -> 반시계 방향 회전 각도
+
+
+# 파일 시그니처 -> Pillow 포맷 이름 (업로드 허용 형식만)
+_SIGNATURES = (
+    (b'\xff\xd8\xff', 'JPEG'),
+    (b'\x89PNG\r\n\x1a\n', 'PNG'),
+    (b'GIF87a', 'GIF'),
+    (b'GIF89a', 'GIF'),
+    (b'BM', 'BMP'),
+)
+
+
+def sniff_format(head):
+    """Image format from the first bytes of a file, or None if it is not an accepted image"""
+    for signature, name in _SIGNATURES:
+        if head.startswith(signature):
+            return name
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'WEBP'
+    return None
+
+
+def _exif_text(value):
+    if isinstance(value, bytes):
+        value = value.decode('utf-8', 'replace')
+    if not isinstance(value, str):
+        return None
+    return value.strip('\x00 ')[:100] or None
+
+
+def _exif_datetime(value):
+    text = _exif_text(value)
+    if not text:
+        return None
+    try:
+        return datetime.strptime(text[:19], '%Y:%m:%d %H:%M:%S')
+    except ValueError:
+        # '0000:00:00 00:00:00' 등 카메라가 채운 빈 값
+        return None
+
+
+def _gps_degrees(value, ref):
+    try:
+        degrees, minutes, seconds = (float(part) for part in value)
+    except (TypeError, ValueError, ZeroDivisionError):
+        return None
+    result = degrees + minutes / 60 + seconds / 3600
+    if not math.isfinite(result):
+        return None
+    return -result if _exif_text(ref) in ('S', 'W') else result
+
+
+def read_metadata(fp):
+    """Dimensions and EXIF fields of an image, keyed like the Photo columns
+
+    ``fp`` is a path or a file object. Pillow stops at the frame header when
+    opening, so the leading few hundred KB of a file are enough (EXIF is
+    limited to 64KB in JPEG). Dimensions are reported upright, i.e. after
+    the EXIF orientation is applied. Returns None if the header cannot be
+    parsed.
+    """
+    from PIL import Image, ExifTags
+    try:
+        with Image.open(fp) as img:
+            exif = img.getexif()
+            orientation = exif.get(ExifTags.Base.Orientation, 1)
+            width, height = img.size
+            if orientation in (5, 6, 7, 8):
+                width, height = height, width
+            details = exif.get_ifd(ExifTags.IFD.Exif)
+            gps = exif.get_ifd(ExifTags.IFD.GPSInfo)
+            return {
+                'taken_at': (_exif_datetime(details.get(ExifTags.Base.DateTimeOriginal))
+                             or _exif_datetime(exif.get(ExifTags.Base.DateTime))),
+                'gps_lat': _gps_degrees(gps.get(ExifTags.GPS.GPSLatitude), gps.get(ExifTags.GPS.GPSLatitudeRef)),
+                'gps_lon': _gps_degrees(gps.get(ExifTags.GPS.GPSLongitude), gps.get(ExifTags.GPS.GPSLongitudeRef)),
+                'camera_make': _exif_text(exif.get(ExifTags.Base.Make)),
+                'camera_model': _exif_text(exif.get(ExifTags.Base.Model)),
+                'orientation': orientation if orientation in range(1, 9) else 1,
+                'original_width': width,
+                'original_height': height,
+            }
+    except Exception:
+        return None
+
+
+def read_metadata_file(path):
+    """Process-pool entry point for backfills: (path, metadata or None, file size or None)"""
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        return path, None, None
+    return path, read_metadata(path), size
+
+
+def exif_orientation(img):
+    """EXIF orientation tag (1 when missing); reading it does not decode pixels"""
+    from PIL import ExifTags
+    try:
+        return img.getexif().get(ExifTags.Base.Orientation, 1)
+    except Exception:
+        return 1
+
+
+def decode_scaled(img, box, profile='balanced', orientation=1):
+    """Decode ``img`` no larger than needed to fit ``box`` after rotation
+
+    For JPEG this uses DCT-domain scaling (``Image.draft``) to decode
+    straight to the nearest 1/2, 1/4 or 1/8 size that is still at least
+    ``reducing_gap`` times the target. Other formats are decoded in full.
+    Must be called before anything else touches the pixel data.
+    """
+    gap = DECODE_PROFILES[profile]['reducing_gap']
+    if gap and img.format == 'JPEG':
+        width, height = box
+        if orientation in (6, 8):
+            # 회전 전 기준으로 가로/세로가 바뀜
+            width, height = height, width
+        # 비율을 유지한 최종 크기 기준으로 요청해야 더 작은 배율이 선택됨
+        scale = min(width / img.width, height / img.height, 1)
+        img.draft(None, (int(img.width * scale * gap), int(img.height * scale * gap)))
+    img.load()
+    return img
+
+
+def fit_within(img, box, profile='balanced'):
+    """Shrink ``img`` in place to fit ``box`` with the profile's resample filter"""
+    from PIL import Image
+    settings = DECODE_PROFILES[profile]
+    if img.width > box[0] or img.height > box[1]:
+        img.thumbnail(box, Image.Resampling[settings['resample']], reducing_gap=settings['reducing_gap'])
+    return img
+
+
+def dhash(img, hash_size=8):
+    """64-bit difference hash: brightness gradients of a 9x8 grayscale thumbnail
+
+    Near-identical shots (bursts, re-encodes, small crops) differ in only a
+    few bits, so the Hamming distance works as a similarity measure.
+    """
+    from PIL import Image
+    gray = img.convert('L').resize((hash_size + 1, hash_size), Image.Resampling.BOX)
+    pixels = gray.tobytes()
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def dhash_file(path):
+    """Process-pool entry point for backfills: (path, dhash or None)"""
+    from PIL import Image
+    try:
+        with Image.open(path) as img:
+            orientation = exif_orientation(img)
+            decode_scaled(img, (64, 64), 'fast')
+            if orientation in ROTATIONS:
+                img = img.rotate(ROTATIONS[orientation], expand=True)
+            return path, dhash(img)
+    except Exception as e:
+        logger.error(f"Error hashing image {path}: {e}")
+        return path, None
+
+
+def compress_image(image_path, max_width=1920, max_height=1080, quality=85, timings=None, profile='balanced',
+                   hashes=None):
+    """Compress image, applying its EXIF orientation
+
+    Returns True on success. The compressed file replaces the original
+    atomically so concurrent readers never see a partially written image.
+    If ``timings`` is a dict it receives the seconds spent decoding,
+    resizing (including rotation) and encoding. If ``hashes`` is a dict it
+    receives the perceptual hash ('dhash') of the upright, resized image.
+    """
+    from PIL import Image
+    if timings is None:
+        timings = {}
+    try:
+        started = time.perf_counter()
+        with Image.open(image_path) as img:
+            # 이미지 회전 정보 확인 (픽셀 디코딩 전)
+            orientation = exif_orientation(img)
+            decode_scaled(img, (max_width, max_height), profile, orientation)
+            decoded = time.perf_counter()
+            timings['decode'] = decoded - started
+
+            # 크기 조정 후 회전 (축소된 이미지를 회전하는 편이 빠름)
+            fit_within(img, (max_width, max_height) if orientation not in (6, 8) else (max_height, max_width), profile)
+            if orientation in ROTATIONS:
+                img = img.rotate(ROTATIONS[orientation], expand=True)
+            resized = time.perf_counter()
+            timings['resize'] = resized - decoded
+
+            # JPEG로 변환하고 압축
+            img = flatten_to_rgb(img)
+            if hashes is not None:
+                hashes['dhash'] = dhash(img)
+
+            # 압축된 이미지 저장
+            tmp_path = f"{image_path}.{os.getpid()}.tmp"
+            img.save(tmp_path, 'JPEG', quality=quality, optimize=True)
+        os.replace(tmp_path, image_path)
+        timings['encode'] = time.perf_counter() - resized
+        return True
+
+    except Exception as e:
+        logger.error(f"Error compressing image {image_path}: {e}")
+        return False
+
+
+def compress_image_timed(image_path, profile='balanced'):
+    """Process-pool entry point: compress and return (ok, stage timings, dhash or None)"""
+    timings = {}
+    hashes = {}
+    ok = compress_image(image_path, timings=timings, profile=profile, hashes=hashes)
+    return ok, timings, hashes.get('dhash')
+
+
+def _load_font(font_path, size):
+    """TrueType font for album captions; Pillow's default font has no Hangul glyphs"""
+    from PIL import ImageFont
+    if font_path:
+        try:
+            return ImageFont.truetype(font_path, size)
+        except OSError:
+            logger.warning(f"Album font not found: {font_path}")
+    return ImageFont.load_default(size=size)
+
+
+def render_album_page(spec):
+    """Render one print-ready album page and return it as JPEG bytes
+
+    ``spec`` holds the page size in pixels, an optional title block, the
+    photos (path plus caption lines) and the font path. Each photo is
+    downsampled to its slot size so the page never carries full-size
+    originals. Runs in a worker process.
+    """
+    # 앨범 작업에서만 필요하므로 웹 프로세스 시작 시에는 임포트하지 않음
+    from PIL import Image, ImageDraw
+    width, height = spec['size']
+    margin = spec.get('margin', width // 14)
+    page = Image.new('RGB', (width, height), (255, 255, 255))
+    draw = ImageDraw.Draw(page)
+    title_font = _load_font(spec.get('font_path'), width // 22)
+    caption_font = _load_font(spec.get('font_path'), width // 48)
+
+    top = margin
+    for line in spec.get('title_lines', []):
+        draw.text((width // 2, top), line, fill=(0, 0, 0), font=title_font, anchor='ma')
+        top += int(title_font.size * 1.6)
+
+    items = spec.get('items', [])
+    if items:
+        caption_height = int(caption_font.size * 1.5) * max(len(item['caption_lines']) for item in items)
+        slot_height = (height - top - margin) // len(items)
+        image_box = (width - 2 * margin, slot_height - caption_height - margin // 2)
+
+        for index, item in enumerate(items):
+            slot_top = top + index * slot_height
+            try:
+                with Image.open(item['path']) as img:
+                    # JPEG는 DCT 단계에서 먼저 축소하여 디코딩 비용 절감
+                    decode_scaled(img, image_box, spec.get('profile', 'balanced'))
+                    img = flatten_to_rgb(img)
+                    fit_within(img, image_box, spec.get('profile', 'balanced'))
+                    left = (width - img.width) // 2
+                    page.paste(img, (left, slot_top))
+                    draw.rectangle((left - 1, slot_top - 1, left + img.width, slot_top + img.height), outline=(180, 180, 180))
+                    caption_top = slot_top + img.height + margin // 6
+            except Exception as e:
+                logger.error(f"Error rendering album photo {item['path']}: {e}")
+                caption_top = slot_top
+
+            for line in item['caption_lines']:
+                draw.text((width // 2, caption_top), line, fill=(40, 40, 40), font=caption_font, anchor='ma')
+                caption_top += int(caption_font.size * 1.5)
+
+    footer = spec.get('footer')
+    if footer:
+        draw.text((width // 2, height - margin // 2), footer, fill=(120, 120, 120), font=caption_font, anchor='md')
+
+    output = io.BytesIO()
+    page.save(output, 'JPEG', quality=spec.get('quality', 85), dpi=(spec.get('dpi', 150),) * 2)
+    return output.getvalue()
@@ -0,0 +1,191 @@
+import os
+import threading
+from collections import Counter
+import click
+from sqlalchemy import update
+from app import app, db
+from models import Blob, Photo
+import imaging
+import project_stats
+import metrics
+import duplicates
+import storage
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Return the process pool for this worker process, creating it lazily
+
+    The pool is created per process (after gunicorn forks) and uses the
+    spawn start method so children never inherit database connections.
+    """
+    global _executor, _executor_pid
+    # 첫 이미지 작업 때 임포트 (웹 프로세스 시작 시간 단축)
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            workers = app.config['INGEST_WORKERS'] or os.cpu_count() or 1
+            _executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def shutdown():
+    """Wait for queued jobs and stop this process's worker pool"""
+    global _executor
+    with _executor_lock:
+        if _executor is not None and _executor_pid == os.getpid():
+            _executor.shutdown(wait=True)
+        _executor = None
+
+
+def _mark_done(photo_id, blob_hash, future):
+    """Flip pending photos to ready/failed once their worker job finishes"""
+    try:
+        ok, timings, dhash = future.result()
+        metrics.record_image_timings('compress', timings)
+    except Exception as e:
+        app.logger.error(f"Ingest worker crashed for photo {photo_id}: {e}")
+        ok, dhash = False, None
+
+    with app.app_context():
+        try:
+            _finish(photo_id, blob_hash, ok, dhash)
+        except Exception as e:
+            db.session.rollback()
+            app.logger.error(f"Error updating ingest status for photo {photo_id}: {e}")
+
+
+def _finish(photo_id, blob_hash, ok, dhash=None):
+    """Record the result of processing one file and commit
+
+    Jobs for content-addressed uploads are resolved by ``blob_hash``: the
+    Blob's new state is committed first, then every photo still pending on
+    it is settled with one statement. A photo registered concurrently that
+    this statement misses is settled by catch_up() once its upload commits.
+    ``photo_id`` is only used for photos stored before blobs existed.
+    ``dhash`` is the unsigned perceptual hash computed by the worker.
+    """
+    status = Photo.STATUS_READY if ok else Photo.STATUS_FAILED
+    if blob_hash:
+        blob = db.session.get(Blob, blob_hash)
+        if blob is None:
+            # 처리 중에 이 내용을 쓰는 사진이 모두 삭제됨
+            return
+        filepath, old_size = blob.filepath, blob.size
+    else:
+        photo = Photo.query.filter_by(id=photo_id, status=Photo.STATUS_PENDING).first()
+        if photo is None:
+            # 처리 중에 삭제된 사진
+            return
+        filepath, old_size = photo.filepath, photo.file_size
+
+    try:
+        if ok:
+            # 압축된 로컬 파일을 저장소에 반영 (로컬 저장소는 그대로)
+            storage.sync(filepath)
+        new_size = os.path.getsize(storage.local_path(filepath))
+    except OSError:
+        new_size = old_size
+    signed_dhash = duplicates.to_signed(dhash) if dhash is not None else None
+
+    if blob_hash:
+        blob.status = status
+        blob.size = new_size
+        db.session.commit()
+        settle_photos(blob_hash, status, old_size, new_size, signed_dhash)
+    else:
+        photo.status = status
+        project_stats.record_resized(photo.project_id, (new_size or 0) - (photo.file_size or 0))
+        photo.file_size = new_size
+        if signed_dhash is not None:
+            photo.dhash = signed_dhash
+    db.session.commit()
+
+
+def settle_photos(blob_hash, status, old_size, new_size, dhash=None):
+    """Move every photo still pending on a finished blob to its state in one statement
+
+    Pending photos were registered with the blob's pre-compression size, so
+    each project's total changes by ``new_size - old_size`` per photo.
+    Returns the number of photos updated.
+    """
+    values = {Photo.status: status, Photo.file_size: new_size}
+    if dhash is not None:
+        values[Photo.dhash] = dhash
+    project_ids = db.session.execute(
+        update(Photo).where(Photo.blob_hash == blob_hash, Photo.status == Photo.STATUS_PENDING)
+        .values(values).returning(Photo.project_id),
+        execution_options={'synchronize_session': False},
+    ).scalars().all()
+    for project_id, count in Counter(project_ids).items():
+        project_stats.record_resized(project_id, ((new_size or 0) - (old_size or 0)) * count)
+    return len(project_ids)
+
+
+def catch_up(blob_hashes):
+    """Settle photos that reused a blob whose processing finished while they were registered
+
+    A photo copies its blob's status when it is added. If the ingest job
+    committed in between, settle_photos() ran before the photo row existed
+    and it would stay pending. Call after the upload commits, with the
+    blob hashes of the photos that reused an existing blob; commits.
+    """
+    if not blob_hashes:
+        return
+    finished = db.session.query(Blob.hash, Blob.status, Blob.size).filter(
+        Blob.hash.in_(set(blob_hashes)), Blob.status != Photo.STATUS_PENDING).all()
+    for blob_hash, status, size in finished:
+        old_size = db.session.query(Photo.file_size).filter_by(
+            blob_hash=blob_hash, status=Photo.STATUS_PENDING).limit(1).scalar()
+        if old_size is None:
+            continue
+        dhash = db.session.query(Photo.dhash).filter(
+            Photo.blob_hash == blob_hash, Photo.dhash.isnot(None)).limit(1).scalar()
+        settled = settle_photos(blob_hash, status, old_size, size, dhash)
+        app.logger.info(f"Settled {settled} photos of blob {blob_hash[:12]} finished during upload")
+    db.session.commit()
+
+
+def enqueue(photos):
+    """Schedule orientation fix, resize and JPEG encode for pending photos"""
+    executor = get_executor()
+    for photo in photos:
+        future = executor.submit(imaging.compress_image_timed, storage.local_path(photo.filepath),
+                                 app.config['IMAGE_PROFILES']['ingest'])
+        future.add_done_callback(
+            lambda f, photo_id=photo.id, blob_hash=photo.blob_hash: _mark_done(photo_id, blob_hash, f))
+
+
+@app.cli.command('ingest-pending')
+@click.option('--project-id', type=int, default=None, help='Only process one project')
+def ingest_pending(project_id):
+    """Process photos left in the pending state (e.g. after a worker restart)"""
+    query = Photo.query.filter_by(status=Photo.STATUS_PENDING).order_by(Photo.id)
+    if project_id is not None:
+        query = query.filter_by(project_id=project_id)
+    # 처리가 끝난 블롭을 쓰는데 pending으로 남은 사진은 다시 압축하지 않고 상태만 맞춤
+    catch_up([blob_hash for (blob_hash,) in query.order_by(None).with_entities(Photo.blob_hash).filter(
+        Photo.blob_hash.isnot(None)).distinct()])
+    # 같은 내용을 공유하는 사진은 파일 하나만 처리
+    pending = {}
+    for photo in query:
+        pending.setdefault(photo.blob_hash or ('photo', photo.id), (photo.id, photo.blob_hash, photo.filepath))
+
+    executor = get_executor()
+    futures = {(photo_id, blob_hash): executor.submit(imaging.compress_image_timed, storage.local_path(filepath),
+                                                      app.config['IMAGE_PROFILES']['ingest'])
+               for photo_id, blob_hash, filepath in pending.values()}
+    failed = 0
+    for (photo_id, blob_hash), future in futures.items():
+        ok, _, dhash = future.result()
+        failed += not ok
+        _finish(photo_id, blob_hash, ok, dhash)
+    click.echo(f"Processed {len(pending)} pending files, failed: {failed}")
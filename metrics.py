@@ -0,0 +1,176 @@
+"""In-process metrics exposed in Prometheus text format on /metrics.
+
+Values are kept per worker process; scrape each gunicorn worker (or run a
+single worker, as gunicorn.conf.py does) to get complete numbers.
+"""
+import time
+import threading
+from bisect import bisect_left
+from flask import Response, g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app import app
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 500, 1000)
+
+_lock = threading.Lock()
+_registry = []
+
+
+def _format_labels(labelnames, values):
+    if not labelnames:
+        return ''
+    pairs = ','.join(f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values))
+    return '{' + pairs + '}'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        _registry.append(self)
+
+    def inc(self, *labels, amount=1):
+        with _lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._values = {}  # labels -> [bucket counts..., +Inf count, sum]
+        _registry.append(self)
+
+    def observe(self, value, *labels):
+        index = bisect_left(self.buckets, value)
+        with _lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [0] * (len(self.buckets) + 2)
+            state[index] += 1
+            state[-1] += value
+
+    def time(self, *labels):
+        """Context manager observing the elapsed wall time"""
+        return _Timer(self, labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        names = self.labelnames + ('le',)
+        for labels, state in sorted(self._values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), state[:-1]):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(names, labels + (bound,))} {cumulative}")
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {state[-1]}")
+            lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels)
+
+
+REQUEST_LATENCY = Histogram('http_request_duration_seconds',
+                            'Time until the response is returned (first byte for streamed responses)',
+                            ('endpoint', 'method'))
+REQUESTS = Counter('http_requests_total', 'HTTP requests handled', ('endpoint', 'method', 'status'))
+REQUEST_QUERIES = Histogram('http_request_db_queries', 'Database queries issued per request',
+                            ('endpoint',), buckets=QUERY_COUNT_BUCKETS)
+BYTES_IN = Counter('http_request_bytes_total', 'Request body bytes received', ('endpoint',))
+BYTES_OUT = Counter('http_response_bytes_total', 'Response body bytes sent', ('endpoint',))
+IMAGE_STAGE = Histogram('image_stage_duration_seconds', 'Image processing time per stage',
+                        ('operation', 'stage'))
+PROJECT_CACHE = Counter('project_cache_lookups_total', 'Project cache lookups (hit, revalidated, miss)',
+                        ('kind', 'result'))
+ARCHIVE_CACHE = Counter('archive_cache_requests_total', 'Project archive snapshot lookups', ('result',))
+RENDITION_CACHE = Counter('rendition_cache_requests_total', 'Rendition cache lookups', ('size', 'format', 'result'))
+
+_SKIP_ENDPOINTS = {'metrics', 'static'}
+
+
+def record_image_timings(operation, timings):
+    """Record the {'decode': s, 'resize': s, 'encode': s} dict produced by imaging"""
+    for stage, seconds in (timings or {}).items():
+        IMAGE_STAGE.observe(seconds, operation, stage)
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    try:
+        g.db_queries = g.get('db_queries', 0) + 1
+    except RuntimeError:
+        # 요청/앱 컨텍스트 밖 (CLI, 백그라운드 스레드)
+        pass
+
+
+@app.before_request
+def _start_timer():
+    g.request_started = time.perf_counter()
+    g.db_queries = 0
+
+
+def _count_streamed(iterable, endpoint):
+    sent = 0
+    try:
+        for chunk in iterable:
+            sent += len(chunk)
+            yield chunk
+    finally:
+        BYTES_OUT.inc(endpoint, amount=sent)
+
+
+@app.after_request
+def _record_request(response):
+    started = g.pop('request_started', None)
+    endpoint = request.endpoint or 'unmatched'
+    if started is None or endpoint in _SKIP_ENDPOINTS:
+        return response
+
+    REQUEST_LATENCY.observe(time.perf_counter() - started, endpoint, request.method)
+    REQUESTS.inc(endpoint, request.method, response.status_code)
+    REQUEST_QUERIES.observe(g.get('db_queries', 0), endpoint)
+    if request.content_length:
+        BYTES_IN.inc(endpoint, amount=request.content_length)
+
+    if response.is_streamed and response.content_length is None:
+        response.response = _count_streamed(response.response, endpoint)
+    elif response.content_length:
+        BYTES_OUT.inc(endpoint, amount=response.content_length)
+    return response
+
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus 메트릭 (text exposition format)"""
+    with _lock:
+        lines = []
+        for metric in _registry:
+            lines.extend(metric.render())
+    return Response('\n'.join(lines) + '\n', mimetype='text/plain; version=0.0.4')
@@ -11,14 +11,37 @@ class Project(db.Model):
     manager_email = db.Column(db.String(120), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    # 사진 통계 (project_stats 모듈에서 업로드/삭제와 같은 트랜잭션으로 갱신)
+    photo_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    total_bytes = db.Column(db.BigInteger, nullable=False, default=0, server_default='0')
+    latest_upload_at = db.Column(db.DateTime, nullable=True)
+    cover_photo_id = db.Column(db.Integer, nullable=True)  # 대표 썸네일 (가장 최근 사진)
+    revision = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # 사진/프로젝트 변경 시 증가 (캐시 키)
+    
     # Relationship to photos
     photos = db.relationship('Photo', backref='project', lazy=True, cascade='all, delete-orphan')
     
     def __repr__(self):
         return f'<Project {self.name}>'
 
+class Blob(db.Model):
+    """Content-addressed file shared by every Photo uploaded with the same bytes"""
+    hash = db.Column(db.String(64), primary_key=True)  # 업로드된 원본의 SHA-256
+    filepath = db.Column(db.String(500), nullable=False)
+    size = db.Column(db.BigInteger, nullable=False)  # 저장된(압축 후) 크기
+    refcount = db.Column(db.Integer, nullable=False, default=1)
+    status = db.Column(db.String(20), nullable=False, default='pending')  # Photo.STATUS_* 값
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<Blob {self.hash[:12]} refs={self.refcount}>'
+
 class Photo(db.Model):
     """Model for uploaded photos"""
+    STATUS_PENDING = 'pending'  # 업로드 완료, 압축 대기 중
+    STATUS_READY = 'ready'
+    STATUS_FAILED = 'failed'  # 압축 실패 (원본 그대로 보관)
+    
     id = db.Column(db.Integer, primary_key=True)
     project_id = db.Column(db.Integer, db.ForeignKey('project.id'), nullable=False)
     filename = db.Column(db.String(255), nullable=False)
@@ -27,6 +50,76 @@ class Photo(db.Model):
     photo_location = db.Column(db.String(200), nullable=True)  # 사진 촬영 위치
     photo_date = db.Column(db.Date, nullable=True)  # 사진 촬영 날짜
     description = db.Column(db.String(500), nullable=True)  # 사진 설명
+    file_size = db.Column(db.BigInteger, nullable=True)  # 저장된 파일 크기 (bytes)
+    blob_hash = db.Column(db.String(64), nullable=True, index=True)  # Blob.hash (참조 수로 관리, 기존 사진은 NULL)
+    status = db.Column(db.String(20), nullable=False, default=STATUS_READY, server_default=STATUS_READY)
+    
+    # 업로드 시 EXIF에서 한 번만 추출 (압축된 파일에는 EXIF가 남지 않음)
+    taken_at = db.Column(db.DateTime, nullable=True)  # DateTimeOriginal (카메라 현지 시각)
+    gps_lat = db.Column(db.Float, nullable=True)
+    gps_lon = db.Column(db.Float, nullable=True)
+    camera_make = db.Column(db.String(100), nullable=True)
+    camera_model = db.Column(db.String(100), nullable=True)
+    orientation = db.Column(db.SmallInteger, nullable=True)  # EXIF orientation (1-8)
+    original_width = db.Column(db.Integer, nullable=True)  # 회전 적용 후 원본 크기, NULL이면 아직 추출 안 됨
+    original_height = db.Column(db.Integer, nullable=True)
+    original_size = db.Column(db.BigInteger, nullable=True)  # 업로드된 원본 파일 크기 (bytes)
+    dhash = db.Column(db.BigInteger, nullable=True)  # 64비트 지각 해시 (부호 있는 정수로 저장, 압축 후 계산)
+    
+    __table_args__ = (
+        # 프로젝트별 최신순 목록 (keyset pagination)
+        db.Index('ix_photo_project_uploaded', 'project_id', 'uploaded_at', 'id'),
+        # 전체 프로젝트 검색 (프로젝트 필터 없이 같은 순서로 keyset pagination)
+        db.Index('ix_photo_uploaded', 'uploaded_at', 'id'),
+        # 촬영 시각 정렬/기간 필터
+        db.Index('ix_photo_project_taken', 'project_id', 'taken_at', 'id'),
+        # 위치 범위 필터
+        db.Index('ix_photo_project_gps', 'project_id', 'gps_lat', 'gps_lon'),
+        # 검색 API 날짜 범위 (프로젝트 내 / 전체 프로젝트)
+        db.Index('ix_photo_project_date', 'project_id', 'photo_date'),
+        db.Index('ix_photo_date', 'photo_date'),
+        # 유사 사진 인덱스 구성 시 해시만 읽음
+        db.Index('ix_photo_project_dhash', 'project_id', 'dhash', 'id'),
+    )
     
     def __repr__(self):
         return f'<Photo {self.filename}>'
+
+class UploadSession(db.Model):
+    """Chunked (resumable) upload in progress"""
+    STATUS_OPEN = 'open'  # 청크 수신 중
+    STATUS_FINALIZING = 'finalizing'  # 완료 요청 하나가 사진 등록 중
+    
+    id = db.Column(db.String(32), primary_key=True)  # uuid4 hex
+    project_id = db.Column(db.Integer, db.ForeignKey('project.id', ondelete='CASCADE'), nullable=False)
+    filename = db.Column(db.String(255), nullable=False)
+    total_size = db.Column(db.BigInteger, nullable=False)
+    chunk_size = db.Column(db.Integer, nullable=False)
+    sha256 = db.Column(db.String(64), nullable=True)  # 전체 파일 체크섬 (선택)
+    description = db.Column(db.String(500), nullable=True)
+    status = db.Column(db.String(20), nullable=False, default=STATUS_OPEN, server_default=STATUS_OPEN)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    @property
+    def chunk_count(self):
+        return max(1, -(-self.total_size // self.chunk_size))
+    
+    def __repr__(self):
+        return f'<UploadSession {self.id} {self.filename}>'
+
+class PendingDeletion(db.Model):
+    """File cleanup queued by bulk deletes and processed by the background reaper
+
+    Either ``blob_hash`` (a blob reference to release) or ``path`` (a file or
+    directory to remove) is set.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    blob_hash = db.Column(db.String(64), nullable=True)
+    path = db.Column(db.String(500), nullable=True)
+    is_dir = db.Column(db.Boolean, nullable=False, default=False)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    last_error = db.Column(db.String(500), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<PendingDeletion {self.blob_hash or self.path}>'
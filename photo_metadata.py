@@ -0,0 +1,53 @@
+import click
+from app import app, db
+from models import Photo
+import imaging
+import ingest
+import storage
+
+COLUMNS = ('taken_at', 'gps_lat', 'gps_lon', 'camera_make', 'camera_model',
+           'orientation', 'original_width', 'original_height', 'original_size')
+
+
+def apply(photo, metadata):
+    """Copy the dict from imaging.read_metadata (plus original_size) onto the photo's columns"""
+    for column in COLUMNS:
+        setattr(photo, column, (metadata or {}).get(column))
+
+
+@app.cli.command('backfill-exif')
+@click.option('--project-id', type=int, default=None, help='Only process one project')
+@click.option('--batch-size', type=int, default=500, show_default=True)
+def backfill_exif(project_id, batch_size):
+    """Extract EXIF columns for photos that were stored before extraction existed
+
+    Only file headers are read, in parallel on the image worker pool. Photos
+    compressed before this existed no longer carry EXIF, so for them only the
+    stored dimensions and size are filled in.
+    """
+    query = db.session.query(Photo.id, Photo.filepath).filter(Photo.original_width.is_(None)).order_by(Photo.id)
+    if project_id is not None:
+        query = query.filter(Photo.project_id == project_id)
+
+    executor = ingest.get_executor()
+    done = failed = 0
+    last_id = 0
+    while True:
+        rows = query.filter(Photo.id > last_id).limit(batch_size).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        paths = {}
+        for photo_id, filepath in rows:
+            paths.setdefault(storage.local_path(filepath), []).append(photo_id)
+
+        # 같은 블롭을 공유하는 사진은 한 번만 읽음
+        for path, metadata, size in executor.map(imaging.read_metadata_file, list(paths), chunksize=16):
+            if metadata is None:
+                failed += len(paths[path])
+                continue
+            for photo in Photo.query.filter(Photo.id.in_(paths[path])):
+                apply(photo, dict(metadata, original_size=photo.original_size or size))
+                done += 1
+        db.session.commit()
+    click.echo(f"Extracted metadata for {done} photos, unreadable: {failed}")
@@ -0,0 +1,139 @@
+"""Per-process cache of project rows and the project list.
+
+Entries are served without a query for PROJECT_CACHE_TTL seconds. After that
+they are revalidated against version stamps kept in the database: a
+project's ``revision`` (bumped by project_stats on every photo or detail
+change) and, for the list, the project count, highest id and revision sum,
+which move on create, delete and any revision bump. Rows are reloaded only
+when the stamp moved, so every worker converges within the TTL; the worker
+that made a change drops its entries right away.
+
+Cached projects are read-only ProjectRecord tuples of the Project columns,
+never ORM instances: they have no relationships, so counts come from the
+photo_count / cover_photo_id aggregates (``photos`` only supports len()). Load the row with Project.query
+before modifying it or when a stale value matters (e.g. the revision keying
+archive snapshots).
+"""
+import time
+import threading
+from collections import namedtuple
+from flask import abort
+from sqlalchemy import func, select
+from app import app, db
+from models import Project
+import metrics
+
+_lock = threading.Lock()
+_projects = {}  # project_id -> (revision, checked_at, project)
+_project_list = None  # (stamp, checked_at, projects)
+
+
+class PhotoCount:
+    """``photos`` of a cached project: has the photo_count length but no photos
+
+    Keeps templates written against the ORM relationship working
+    (``project.photos|length``, ``{% if project.photos %}``) without loading
+    any rows. Iterating fails loudly instead of showing an empty list.
+    """
+    __slots__ = ('count',)
+
+    def __init__(self, count):
+        self.count = count or 0
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        raise TypeError("Cached projects do not load photos; query Photo or use cover_photo_id")
+
+
+class ProjectRecord(namedtuple('ProjectRecord', [column.name for column in Project.__table__.columns])):
+    """Read-only snapshot of a Project row"""
+    __slots__ = ()
+
+    @property
+    def photos(self):
+        return PhotoCount(self.photo_count)
+
+
+def _copy(row):
+    return ProjectRecord(**row._mapping)
+
+
+def _fresh(checked_at, now):
+    return now - checked_at < app.config['PROJECT_CACHE_TTL']
+
+
+def get_project(project_id):
+    """The project with ``project_id`` or None"""
+    now = time.monotonic()
+    with _lock:
+        entry = _projects.get(project_id)
+    if entry and _fresh(entry[1], now):
+        metrics.PROJECT_CACHE.inc('project', 'hit')
+        return entry[2]
+
+    if entry:
+        revision = db.session.query(Project.revision).filter_by(id=project_id).scalar()
+        if revision == entry[0]:
+            with _lock:
+                _projects[project_id] = (revision, now, entry[2])
+            metrics.PROJECT_CACHE.inc('project', 'revalidated')
+            return entry[2]
+
+    metrics.PROJECT_CACHE.inc('project', 'miss')
+    row = db.session.execute(select(*Project.__table__.columns).where(Project.id == project_id)).first()
+    with _lock:
+        if row is None:
+            _projects.pop(project_id, None)
+            return None
+        project = _copy(row)
+        _projects[project_id] = (project.revision, now, project)
+    return project
+
+
+def get_project_or_404(project_id):
+    project = get_project(project_id)
+    if project is None:
+        abort(404)
+    return project
+
+
+def _list_stamp():
+    return tuple(db.session.query(
+        func.count(Project.id), func.max(Project.id), func.coalesce(func.sum(Project.revision), 0)
+    ).one())
+
+
+def project_list():
+    """All projects, newest first"""
+    global _project_list
+    now = time.monotonic()
+    with _lock:
+        entry = _project_list
+    if entry and _fresh(entry[1], now):
+        metrics.PROJECT_CACHE.inc('list', 'hit')
+        return entry[2]
+
+    stamp = _list_stamp()
+    if entry and entry[0] == stamp:
+        with _lock:
+            _project_list = (stamp, now, entry[2])
+        metrics.PROJECT_CACHE.inc('list', 'revalidated')
+        return entry[2]
+
+    metrics.PROJECT_CACHE.inc('list', 'miss')
+    projects = [_copy(row) for row in db.session.execute(
+        select(*Project.__table__.columns).order_by(Project.created_at.desc()))]
+    with _lock:
+        _project_list = (stamp, now, projects)
+    return projects
+
+
+def invalidate(project_id=None):
+    """Drop a project (and always the list) from this worker's cache"""
+    global _project_list
+    with _lock:
+        if project_id is not None:
+            _projects.pop(project_id, None)
+        _project_list = None
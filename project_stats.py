@@ -0,0 +1,87 @@
+import os
+import click
+from sqlalchemy import func
+from app import app, db
+from models import Project, Photo
+import project_cache
+import storage
+
+
+def record_added(project_id, photos):
+    """Add freshly inserted photos to the project's aggregates
+
+    Must run in the same transaction as the inserts. Uses column arithmetic
+    so concurrent uploads to the same project don't overwrite each other.
+    """
+    if not photos:
+        return
+    db.session.flush()
+    newest = max(photos, key=lambda photo: (photo.uploaded_at, photo.id))
+    Project.query.filter_by(id=project_id).update({
+        Project.revision: Project.revision + 1,
+        Project.photo_count: Project.photo_count + len(photos),
+        Project.total_bytes: Project.total_bytes + sum(photo.file_size or 0 for photo in photos),
+        Project.latest_upload_at: newest.uploaded_at,
+        Project.cover_photo_id: newest.id,
+    }, synchronize_session=False)
+    project_cache.invalidate(project_id)
+
+
+def record_resized(project_id, delta_bytes):
+    """Adjust total bytes after a photo file was rewritten (e.g. compressed)"""
+    Project.query.filter_by(id=project_id).update({
+        Project.revision: Project.revision + 1,
+        Project.total_bytes: Project.total_bytes + delta_bytes,
+    }, synchronize_session=False)
+    project_cache.invalidate(project_id)
+
+
+def touch(project_id):
+    """Bump the project's revision after its photos or details were edited
+
+    Must run in the same transaction as the change. Caches keyed by the
+    revision (e.g. archive snapshots) are then rebuilt on next use.
+    """
+    Project.query.filter_by(id=project_id).update({
+        Project.revision: Project.revision + 1,
+    }, synchronize_session=False)
+    project_cache.invalidate(project_id)
+
+
+def refresh(project_id):
+    """Recompute a project's aggregates from its photo rows (used after deletes)"""
+    db.session.flush()
+    count, total_bytes, latest = db.session.query(
+        func.count(Photo.id),
+        func.coalesce(func.sum(Photo.file_size), 0),
+        func.max(Photo.uploaded_at),
+    ).filter(Photo.project_id == project_id).one()
+    cover_id = db.session.query(Photo.id).filter(Photo.project_id == project_id).order_by(
+        Photo.uploaded_at.desc(), Photo.id.desc()).limit(1).scalar()
+    Project.query.filter_by(id=project_id).update({
+        Project.revision: Project.revision + 1,
+        Project.photo_count: count,
+        Project.total_bytes: total_bytes,
+        Project.latest_upload_at: latest,
+        Project.cover_photo_id: cover_id,
+    }, synchronize_session=False)
+    project_cache.invalidate(project_id)
+
+
+@app.cli.command('refresh-project-stats')
+@click.option('--fill-sizes', is_flag=True, help='Also fill missing Photo.file_size from disk')
+def refresh_project_stats(fill_sizes):
+    """Recompute photo count, total bytes, latest upload and cover for every project"""
+    if fill_sizes:
+        for photo in Photo.query.filter(Photo.file_size.is_(None)).yield_per(500):
+            try:
+                photo.file_size = os.path.getsize(storage.local_path(photo.filepath))
+            except OSError:
+                pass
+        db.session.commit()
+
+    project_ids = [project_id for (project_id,) in db.session.query(Project.id)]
+    for project_id in project_ids:
+        refresh(project_id)
+    db.session.commit()
+    click.echo(f"Refreshed stats for {len(project_ids)} projects")
@@ -0,0 +1,283 @@
+import os
+import time
+import threading
+import click
+from app import app
+from models import Photo
+import imaging
+import metrics
+import storage
+
+# 렌디션 크기 정의 (이름 -> 최대 가로/세로)
+RENDITION_SIZES = {
+    'thumb': (300, 300),
+    'preview': (1024, 1024),
+}
+
+RENDITION_DIRNAME = '.renditions'
+
+# 렌디션 포맷 (이름 -> Pillow 포맷, MIME 타입, 확장자, Pillow 기능 이름)
+RENDITION_FORMATS = {
+    'avif': ('AVIF', 'image/avif', 'avif', 'avif'),
+    'webp': ('WEBP', 'image/webp', 'webp', 'webp'),
+    'jpeg': ('JPEG', 'image/jpeg', 'jpg', None),
+}
+_EXTENSIONS = tuple(f".{ext}" for _, _, ext, _ in RENDITION_FORMATS.values())
+
+# 캐시 적중 시 mtime 갱신 주기 (매 요청마다 utime을 호출하지 않도록)
+_TOUCH_INTERVAL = 3600
+
+# 캐시 용량: 쓰기마다 누적하고 상한을 넘거나 재확인 주기가 지나면 백그라운드에서 전체 스캔
+_CACHE_RESCAN_INTERVAL = 300
+_cache_lock = threading.Lock()
+_evict_lock = threading.Lock()
+_cache_bytes = None  # 이 프로세스가 추정한 캐시 크기 (None = 아직 스캔 전)
+_cache_scanned_at = 0.0
+
+
+def rendition_dir(photo):
+    """Directory holding cached renditions inside the photo's project directory"""
+    return os.path.join(app.config['UPLOAD_FOLDER'], str(photo.project_id), RENDITION_DIRNAME)
+
+
+def source_version(photo):
+    """Identifies the content renditions of ``photo`` are made from, without reading it
+
+    A blob's bytes change only once, when ingest replaces the upload with
+    its compressed version and the photo leaves the pending state, so the
+    hash plus that state is enough and stays valid when a local copy of an
+    S3 object is evicted. Photos stored before blobs existed fall back to
+    their file's mtime.
+    """
+    if photo.blob_hash:
+        compressed = 'c' if photo.status == Photo.STATUS_READY else 'o'
+        return f"{photo.blob_hash[:20]}{compressed}"
+    return str(os.stat(storage.local_path(photo.filepath)).st_mtime_ns)
+
+
+def rendition_path(photo, size, version, fmt='jpeg'):
+    """Cache path keyed by photo id, size name, source version and format"""
+    ext = RENDITION_FORMATS[fmt][2]
+    return os.path.join(rendition_dir(photo), f"{photo.id}_{size}_{version}.{ext}")
+
+
+def available_formats():
+    """Formats enabled in RENDITION_FORMATS that this Pillow build can encode, in preference order"""
+    from PIL import features
+    return [fmt for fmt in app.config['RENDITION_FORMATS']
+            if fmt in RENDITION_FORMATS and (RENDITION_FORMATS[fmt][3] is None or features.check(RENDITION_FORMATS[fmt][3]))]
+
+
+def negotiate(accepted_mimetypes):
+    """Pick the preferred format the client explicitly accepts; JPEG otherwise
+
+    Only explicitly listed types count: ``*/*`` alone (curl, old clients)
+    gets JPEG rather than whatever format happens to be preferred.
+    """
+    for fmt in available_formats():
+        if RENDITION_FORMATS[fmt][1] in accepted_mimetypes:
+            return fmt
+    return 'jpeg'
+
+
+def mimetype(fmt):
+    return RENDITION_FORMATS[fmt][1]
+
+
+def save_image(img, path, fmt):
+    options = app.config['RENDITION_ENCODE_OPTIONS'].get(fmt, {})
+    img.save(path, RENDITION_FORMATS[fmt][0], **options)
+
+
+def _render(source_path, target_path, size, fmt='jpeg'):
+    """Decode the original once and write a rendition atomically"""
+    from PIL import Image
+    os.makedirs(os.path.dirname(target_path), exist_ok=True)
+    tmp_path = f"{target_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    profile = app.config['IMAGE_PROFILES'][size]
+    box = RENDITION_SIZES[size]
+    with Image.open(source_path) as img:
+        orientation = imaging.exif_orientation(img)
+        if orientation in (6, 8):
+            box = box[::-1]
+        with metrics.IMAGE_STAGE.time('rendition', 'decode'):
+            imaging.decode_scaled(img, box, profile)
+        with metrics.IMAGE_STAGE.time('rendition', 'resize'):
+            imaging.fit_within(img, box, profile)
+            if orientation in imaging.ROTATIONS:
+                img = img.rotate(imaging.ROTATIONS[orientation], expand=True)
+        with metrics.IMAGE_STAGE.time('rendition', 'encode'):
+            img = imaging.flatten_to_rgb(img)
+            save_image(img, tmp_path, fmt)
+    os.replace(tmp_path, target_path)
+
+
+def _remove_stale(photo, size, version):
+    """Remove renditions of the same photo/size made from an older source (any format)"""
+    directory = rendition_dir(photo)
+    prefix = f"{photo.id}_{size}_"
+    current = f"{prefix}{version}."
+    try:
+        entries = os.listdir(directory)
+    except FileNotFoundError:
+        return
+    for name in entries:
+        path = os.path.join(directory, name)
+        if name.startswith(prefix) and not name.startswith(current):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def get_rendition(photo, size='thumb', fmt='jpeg'):
+    """Return the path of a cached rendition, generating it on first use"""
+    if size not in RENDITION_SIZES:
+        raise ValueError(f"Unknown rendition size: {size}")
+    if fmt not in RENDITION_FORMATS:
+        raise ValueError(f"Unknown rendition format: {fmt}")
+
+    version = source_version(photo)
+    path = rendition_path(photo, size, version, fmt)
+
+    try:
+        last_used = os.stat(path).st_mtime
+    except FileNotFoundError:
+        metrics.RENDITION_CACHE.inc(size, fmt, 'miss')
+        # 원본은 캐시에 없을 때만 읽음 (S3는 이때 로컬 사본을 받음)
+        _render(storage.local_path(photo.filepath), path, size, fmt)
+        _remove_stale(photo, size, version)
+        record_write(path)
+        return path
+
+    metrics.RENDITION_CACHE.inc(size, fmt, 'hit')
+    # LRU 순서를 위해 사용 시각 갱신
+    now = time.time()
+    if now - last_used > _TOUCH_INTERVAL:
+        try:
+            os.utime(path, (now, now))
+        except OSError:
+            pass
+    return path
+
+
+def invalidate(photo):
+    """Delete every cached rendition of a photo"""
+    directory = rendition_dir(photo)
+    prefix = f"{photo.id}_"
+    try:
+        entries = os.listdir(directory)
+    except FileNotFoundError:
+        return
+    for name in entries:
+        if name.startswith(prefix):
+            try:
+                os.remove(os.path.join(directory, name))
+            except OSError:
+                pass
+
+
+def _iter_cache_entries():
+    """Yield (path, size_bytes, last_used) for every cached rendition"""
+    upload_root = app.config['UPLOAD_FOLDER']
+    if not os.path.isdir(upload_root):
+        return
+    for project_entry in os.scandir(upload_root):
+        if not project_entry.is_dir():
+            continue
+        directory = os.path.join(project_entry.path, RENDITION_DIRNAME)
+        if not os.path.isdir(directory):
+            continue
+        for entry in os.scandir(directory):
+            if entry.is_file() and entry.name.endswith(_EXTENSIONS):
+                stat = entry.stat()
+                yield entry.path, stat.st_size, stat.st_mtime
+
+
+def enforce_cache_limit(max_bytes=None):
+    """Evict least recently used renditions until the cache fits the cap
+
+    Walks every project's cache directory, so the request path never calls
+    it directly: record_write() schedules it when the running total says so.
+    """
+    global _cache_bytes, _cache_scanned_at
+    if max_bytes is None:
+        max_bytes = app.config['RENDITION_CACHE_MAX_BYTES']
+    entries = list(_iter_cache_entries())
+    total = sum(size for _, size, _ in entries)
+
+    removed = 0
+    if total > max_bytes:
+        for path, size, _ in sorted(entries, key=lambda e: e[2]):
+            if total <= max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+                removed += 1
+            except OSError:
+                pass
+    with _cache_lock:
+        _cache_bytes = total
+        _cache_scanned_at = time.monotonic()
+    return removed
+
+
+def _run_eviction():
+    try:
+        enforce_cache_limit()
+    except Exception as e:
+        app.logger.error(f"Error evicting renditions: {e}")
+    finally:
+        _evict_lock.release()
+
+
+def record_write(path):
+    """Add a new cache file to the running total; evict in the background when needed
+
+    The total only counts this process's writes between scans, so a full
+    scan also runs every _CACHE_RESCAN_INTERVAL seconds to pick up what
+    other workers wrote or removed.
+    """
+    global _cache_bytes
+    try:
+        size = os.stat(path).st_size
+    except OSError:
+        return
+    with _cache_lock:
+        if _cache_bytes is not None:
+            _cache_bytes += size
+        due = (_cache_bytes is None or _cache_bytes > app.config['RENDITION_CACHE_MAX_BYTES']
+               or time.monotonic() - _cache_scanned_at > _CACHE_RESCAN_INTERVAL)
+    # 이미 스캔 중이면 그 결과를 기다리지 않고 넘어감
+    if due and _evict_lock.acquire(blocking=False):
+        threading.Thread(target=_run_eviction, name='rendition-eviction', daemon=True).start()
+
+
+@app.cli.command('backfill-renditions')
+@click.option('--project-id', type=int, default=None, help='Only process one project')
+@click.option('--size', 'sizes', multiple=True, type=click.Choice(list(RENDITION_SIZES)),
+              help='Rendition sizes to generate (default: all)')
+@click.option('--format', 'formats', multiple=True, type=click.Choice(list(RENDITION_FORMATS)),
+              help='Formats to generate (default: every enabled format)')
+def backfill_renditions(project_id, sizes, formats):
+    """Generate missing renditions for existing photos"""
+    sizes = sizes or tuple(RENDITION_SIZES)
+    formats = formats or available_formats()
+    query = Photo.query.order_by(Photo.id)
+    if project_id is not None:
+        query = query.filter_by(project_id=project_id)
+
+    generated = failed = 0
+    for photo in query.yield_per(500):
+        if not storage.exists(photo.filepath):
+            continue
+        for size in sizes:
+            for fmt in formats:
+                try:
+                    get_rendition(photo, size, fmt)
+                    generated += 1
+                except Exception as e:
+                    failed += 1
+                    app.logger.error(f"Error creating rendition {size}/{fmt} for photo {photo.id}: {e}")
+    click.echo(f"Renditions ready: {generated}, failed: {failed}")
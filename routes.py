@@ -1,15 +1,32 @@
 import os
-import zipfile
-import shutil
 import re
+import base64
+import mimetypes
+import binascii
 from datetime import datetime
-from flask import render_template, request, redirect, url_for, flash, send_file, jsonify, abort
+from urllib.parse import quote
+from flask import render_template, request, redirect, url_for, flash, send_file, jsonify, abort, Response, stream_with_context
 from werkzeug.utils import secure_filename
-from PIL import Image, ExifTags
+from sqlalchemy import tuple_, update
 import io
-import tempfile
 from app import app, db
-from models import Project, Photo
+from models import Project, Photo, UploadSession
+import renditions
+import blobs
+import ingest
+import archives
+import chunked_uploads
+import project_stats
+import deletions
+import albums
+import streaming_uploads
+import photo_metadata
+import search
+import duplicates
+import sprites
+import imaging
+import storage
+import project_cache
 
 # Allowed file extensions
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'bmp', 'webp'}
@@ -19,50 +36,6 @@ def allowed_file(filename):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def compress_image(image_path, max_width=1920, max_height=1080, quality=85):
-    """Compress image while preserving EXIF data"""
-    try:
-        with Image.open(image_path) as img:
-            # 원본 EXIF 데이터 보존
-            exif_dict = None
-            if hasattr(img, '_getexif') and img._getexif() is not None:
-                exif_dict = img._getexif()
-            
-            # 이미지 회전 정보 확인 및 적용
-            if exif_dict:
-                for tag, value in exif_dict.items():
-                    if tag in ExifTags.TAGS:
-                        if ExifTags.TAGS[tag] == 'Orientation':
-                            if value == 3:
-                                img = img.rotate(180, expand=True)
-                            elif value == 6:
-                                img = img.rotate(270, expand=True)
-                            elif value == 8:
-                                img = img.rotate(90, expand=True)
-                            break
-            
-            # 크기 조정
-            original_width, original_height = img.size
-            if original_width > max_width or original_height > max_height:
-                img.thumbnail((max_width, max_height), Image.Resampling.LANCZOS)
-            
-            # JPEG로 변환하고 압축
-            if img.mode in ('RGBA', 'LA', 'P'):
-                # 투명도가 있는 이미지는 흰색 배경으로 변환
-                background = Image.new('RGB', img.size, (255, 255, 255))
-                if img.mode == 'P':
-                    img = img.convert('RGBA')
-                background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
-                img = background
-            elif img.mode != 'RGB':
-                img = img.convert('RGB')
-            
-            # 압축된 이미지 저장
-            img.save(image_path, 'JPEG', quality=quality, optimize=True)
-            
-    except Exception as e:
-        app.logger.error(f"Error compressing image {image_path}: {e}")
-
 def extract_photo_info(filename):
     """Extract photo information from filename"""
     # 파일명에서 확장자 제거
@@ -92,7 +65,7 @@ def extract_photo_info(filename):
 @app.route('/')
 def index():
     """Main page showing all projects"""
-    projects = Project.query.order_by(Project.created_at.desc()).all()
+    projects = project_cache.project_list()
     return render_template('index.html', projects=projects)
 
 @app.route('/create_project', methods=['GET', 'POST'])
@@ -125,6 +98,7 @@ def create_project():
             )
             db.session.add(project)
             db.session.commit()
+            project_cache.invalidate()
             
             # Create project directory
             project_dir = os.path.join(app.config['UPLOAD_FOLDER'], str(project.id))
@@ -140,91 +114,129 @@ def create_project():
     
     return render_template('create_project.html')
 
+def add_uploaded_photo(project_id, original_filename, store, default_description=None, metadata=None,
+                       existing_names=None):
+    """Store an uploaded file in the blob store and add a Photo row
+
+    ``store`` is called with the file extension and returns ``(blob, created)``
+    (see streaming_uploads.UploadPart.commit / blobs.store_file). ``metadata``
+    is the dict from imaging.read_metadata plus ``original_size``. Shared by the
+    form upload, the chunked upload finalize step and bulk_import. ``existing_names``
+    is an optional set of the project's filenames checked instead of one query
+    per file; the chosen name is added to it. Returns ``(photo, created)``; only
+    photos whose blob was just created need processing.
+    """
+    # Secure the filename
+    filename = secure_filename(original_filename)
+    app.logger.debug(f"Secured filename: {filename}")
+    
+    # Generate unique filename if already exists in this project
+    counter = 1
+    name, ext = os.path.splitext(filename)
+    while (filename in existing_names if existing_names is not None else
+           db.session.query(Photo.id).filter_by(project_id=project_id, filename=filename).first()):
+        filename = f"{name}_{counter}{ext}"
+        counter += 1
+    if existing_names is not None:
+        existing_names.add(filename)
+    
+    # Save the file (같은 내용은 한 번만 저장/압축)
+    blob, created = store(ext)
+    app.logger.debug(f"File stored as blob {blob.hash} (new: {created})")
+    
+    # 이미 처리된 같은 내용의 파일이면 지각 해시도 같음
+    dhash = None
+    if not created:
+        dhash = db.session.query(Photo.dhash).filter(
+            Photo.blob_hash == blob.hash, Photo.dhash.isnot(None)).limit(1).scalar()
+    
+    # 파일명에서 정보 추출 (파일명에 날짜가 없으면 EXIF 촬영일 사용)
+    photo_date, description = extract_photo_info(filename)
+    if not photo_date and metadata and metadata.get('taken_at'):
+        photo_date = metadata['taken_at'].date()
+    
+    # 파일명에서 추출된 설명이 없으면 기본 설명 사용
+    if not description and default_description:
+        description = default_description
+    
+    # Save to database
+    photo = Photo(
+        project_id=project_id,
+        filename=filename,
+        filepath=blob.filepath,
+        blob_hash=blob.hash,
+        photo_date=photo_date,
+        description=description,
+        file_size=blob.size,
+        status=blob.status,
+        dhash=dhash
+    )
+    photo_metadata.apply(photo, metadata)
+    db.session.add(photo)
+    app.logger.debug(f"Photo record added to database: {filename} with date: {photo_date}, description: {description}")
+    return photo, created
+
 @app.route('/upload_photos/<int:project_id>', methods=['GET', 'POST'])
 def upload_photos(project_id):
     """Upload photos to a specific project"""
-    project = Project.query.get_or_404(project_id)
+    project = project_cache.get_project_or_404(project_id)
     
     if request.method == 'POST':
         app.logger.debug(f"Upload request received for project {project_id}")
-        app.logger.debug(f"Request files: {request.files}")
         
-        if 'photos' not in request.files:
-            app.logger.error("No 'photos' field in request.files")
+        boundary = request.mimetype_params.get('boundary')
+        if request.mimetype != 'multipart/form-data' or not boundary:
             flash('파일이 선택되지 않았습니다.', 'error')
             return redirect(request.url)
         
-        # 기본 설명 가져오기
-        default_description = request.form.get('default_description', '').strip()
+        # 요청 본문을 읽으면서 각 파일을 바로 블롭 저장소에 기록 (임시 파일 스풀링 없음)
+        try:
+            fields, parts = streaming_uploads.parse_upload(
+                request.stream, boundary.encode('latin-1'),
+                lambda name, filename: name == 'photos' and allowed_file(filename))
+        except streaming_uploads.UploadError as e:
+            flash(str(e), 'error')
+            return redirect(request.url)
         
-        files = request.files.getlist('photos')
-        app.logger.debug(f"Found {len(files)} files")
-        uploaded_count = 0
+        # 기본 설명 가져오기 (폼 필드 순서와 무관하게 본문을 다 읽은 뒤 적용)
+        default_description = fields.get('default_description', '').strip()
         
-        # Create project directory if it doesn't exist
-        project_dir = os.path.join(app.config['UPLOAD_FOLDER'], str(project_id))
-        os.makedirs(project_dir, exist_ok=True)
+        app.logger.debug(f"Found {len(parts)} files")
+        uploaded_count = 0
+        added_photos = []
+        pending_photos = []
+        reused_blobs = []
         
-        for file in files:
-            app.logger.debug(f"Processing file: {file.filename if file else 'None'}")
-            if file and file.filename and allowed_file(file.filename):
-                try:
-                    app.logger.debug(f"File {file.filename} is valid, processing...")
-                    # Secure the filename
-                    filename = secure_filename(file.filename)
-                    app.logger.debug(f"Secured filename: {filename}")
-                    
-                    # Generate unique filename if already exists
-                    counter = 1
-                    name, ext = os.path.splitext(filename)
-                    while os.path.exists(os.path.join(project_dir, filename)):
-                        filename = f"{name}_{counter}{ext}"
-                        counter += 1
-                    
-                    filepath = os.path.join(project_dir, filename)
-                    app.logger.debug(f"Saving to: {filepath}")
-                    
-                    # Save the file
-                    file.save(filepath)
-                    app.logger.debug(f"File saved successfully: {filepath}")
-                    
-                    # 이미지 압축 처리
-                    try:
-                        compress_image(filepath)
-                        app.logger.debug(f"Image compressed: {filepath}")
-                    except Exception as e:
-                        app.logger.error(f"Error compressing image {filepath}: {e}")
-                    
-                    # 파일명에서 정보 추출
-                    photo_date, description = extract_photo_info(filename)
-                    
-                    # 파일명에서 추출된 설명이 없으면 기본 설명 사용
-                    if not description and default_description:
-                        description = default_description
-                    
-                    # Save to database
-                    photo = Photo(
-                        project_id=project_id,
-                        filename=filename,
-                        filepath=filepath,
-                        photo_date=photo_date,
-                        description=description
-                    )
-                    db.session.add(photo)
-                    uploaded_count += 1
-                    app.logger.debug(f"Photo record added to database: {filename} with date: {photo_date}, description: {description}")
-                    
-                except Exception as e:
-                    app.logger.error(f"Error uploading file {file.filename}: {e}")
-                    import traceback
-                    app.logger.error(f"Traceback: {traceback.format_exc()}")
-                    continue
-            else:
-                app.logger.warning(f"File skipped - file: {file}, filename: {file.filename if file else 'None'}, allowed: {allowed_file(file.filename) if file and file.filename else 'N/A'}")
+        for part in parts:
+            if part.error:
+                app.logger.warning(f"File skipped - filename: {part.filename}, reason: {part.error}")
+                flash(f'{part.filename}: {part.error}', 'error')
+                continue
+            try:
+                app.logger.debug(f"File {part.filename} received ({part.size} bytes, {part.format}), registering...")
+                photo, created = add_uploaded_photo(project_id, part.filename, part.commit, default_description,
+                                                    dict(part.metadata or {}, original_size=part.size))
+                added_photos.append(photo)
+                if created:
+                    pending_photos.append(photo)
+                elif photo.status == Photo.STATUS_PENDING:
+                    reused_blobs.append(photo.blob_hash)
+                uploaded_count += 1
+                
+            except Exception as e:
+                app.logger.error(f"Error uploading file {part.filename}: {e}")
+                import traceback
+                app.logger.error(f"Traceback: {traceback.format_exc()}")
+                part.discard()
+                continue
         
         if uploaded_count > 0:
+            project_stats.record_added(project_id, added_photos)
             db.session.commit()
-            flash(f'{uploaded_count}개의 사진이 성공적으로 업로드되었습니다.', 'success')
+            ingest.enqueue(pending_photos)
+            # 다른 업로드의 처리가 커밋 직전에 끝났다면 pending으로 남지 않게 맞춤
+            ingest.catch_up(reused_blobs)
+            flash(f'{uploaded_count}개의 사진이 성공적으로 업로드되었습니다. 이미지 최적화는 백그라운드에서 진행됩니다.', 'success')
         else:
             flash('업로드된 사진이 없습니다. 지원되는 형식(PNG, JPG, JPEG, GIF, BMP, WEBP)인지 확인해주세요.', 'error')
         
@@ -232,65 +244,372 @@ def upload_photos(project_id):
     
     return render_template('upload_photos.html', project=project)
 
+@app.route('/upload_sessions/<int:project_id>', methods=['POST'])
+def create_upload_session(project_id):
+    """분할 업로드 시작 API"""
+    project_cache.get_project_or_404(project_id)
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data, dict):
+        return jsonify({'success': False, 'error': '요청 형식이 올바르지 않습니다.'}), 400
+    
+    filename = data.get('filename') or ''
+    if not isinstance(filename, str) or not allowed_file(filename.strip()):
+        return jsonify({'success': False, 'error': '지원되지 않는 파일 형식입니다.'}), 400
+    filename = filename.strip()
+    
+    sha256 = data.get('sha256')
+    if sha256 is not None and not chunked_uploads.is_sha256(sha256):
+        return jsonify({'success': False, 'error': 'sha256은 64자리 16진수 문자열이어야 합니다.'}), 400
+    description = data.get('description') or ''
+    if not isinstance(description, str):
+        return jsonify({'success': False, 'error': '설명은 문자열이어야 합니다.'}), 400
+    
+    try:
+        total_size = int(data.get('size'))
+        chunk_size = int(data.get('chunk_size') or app.config['UPLOAD_CHUNK_SIZE'])
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'error': '파일 크기가 올바르지 않습니다.'}), 400
+    
+    if total_size <= 0 or total_size > app.config['CHUNKED_UPLOAD_MAX_BYTES']:
+        return jsonify({'success': False, 'error': '파일 크기가 허용 범위를 벗어났습니다.'}), 400
+    if chunk_size <= 0 or chunk_size > app.config['MAX_CONTENT_LENGTH']:
+        return jsonify({'success': False, 'error': '청크 크기가 허용 범위를 벗어났습니다.'}), 400
+    
+    try:
+        upload = chunked_uploads.create_session(
+            project_id, filename, total_size, chunk_size,
+            sha256=sha256,
+            description=description.strip() or None,
+        )
+    except Exception as e:
+        db.session.rollback()
+        app.logger.error(f"Error creating upload session: {e}")
+        return jsonify({'success': False, 'error': '업로드 세션 생성에 실패했습니다.'}), 500
+    
+    return jsonify(_upload_session_state(upload)), 201
+
+@app.route('/upload_sessions/<upload_id>', methods=['GET'])
+def upload_session_status(upload_id):
+    """분할 업로드 진행 상태 조회 (재개 지점 확인용)"""
+    upload = UploadSession.query.get_or_404(upload_id)
+    return jsonify(_upload_session_state(upload))
+
+@app.route('/upload_sessions/<upload_id>/chunks/<int:index>', methods=['PUT'])
+def upload_chunk(upload_id, index):
+    """청크 업로드 API (X-Chunk-SHA256 헤더 필수, 병렬 전송 가능)"""
+    upload = UploadSession.query.get_or_404(upload_id)
+    if upload.status != UploadSession.STATUS_OPEN:
+        return jsonify({'success': False, 'error': '이미 완료 처리 중인 업로드입니다.'}), 409
+    
+    try:
+        chunked_uploads.write_chunk(upload, index, request.get_data(cache=False),
+                                    request.headers.get('X-Chunk-SHA256'))
+    except chunked_uploads.ChunkError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        app.logger.error(f"Error writing chunk {index} of upload {upload_id}: {e}")
+        return jsonify({'success': False, 'error': '청크 저장에 실패했습니다.'}), 500
+    
+    return jsonify(_upload_session_state(upload))
+
+@app.route('/upload_sessions/<upload_id>/finalize', methods=['POST'])
+def finalize_upload_session(upload_id):
+    """분할 업로드 완료 처리 - 일반 업로드와 동일한 방식으로 사진 등록"""
+    upload = UploadSession.query.get_or_404(upload_id)
+    # 동시에 들어온 완료 요청 중 하나만 진행 (나머지는 409)
+    if not chunked_uploads.claim(upload):
+        return jsonify({'success': False, 'error': '이미 완료 처리 중인 업로드입니다.'}), 409
+    
+    try:
+        chunked_uploads.verify_complete(upload)
+    except chunked_uploads.ChunkError as e:
+        chunked_uploads.unclaim(upload_id)
+        return jsonify({'success': False, 'error': str(e), **_upload_session_state(upload)}), 409
+    
+    try:
+        # 블롭 저장소로 옮기기 전에 형식 확인 후 헤더만 읽어 EXIF 추출
+        metadata = chunked_uploads.read_image_metadata(upload)
+    except chunked_uploads.ChunkError as e:
+        # 이미지가 아니면 세션과 임시 파일을 버림 (일반 업로드와 동일하게 거부)
+        chunked_uploads.discard(upload)
+        db.session.commit()
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    part_path = chunked_uploads.data_path(upload.id)
+    metadata['original_size'] = upload.total_size
+    
+    try:
+        photo, created = add_uploaded_photo(
+            upload.project_id, upload.filename,
+            lambda ext: blobs.store_file(part_path, ext, sha256=upload.sha256),
+            upload.description, metadata)
+        project_stats.record_added(upload.project_id, [photo])
+        chunked_uploads.discard(upload)
+        reused_blob = photo.blob_hash if not created and photo.status == Photo.STATUS_PENDING else None
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        chunked_uploads.unclaim(upload_id)
+        app.logger.error(f"Error finalizing upload {upload_id}: {e}")
+        return jsonify({'success': False, 'error': '업로드 완료 처리에 실패했습니다.'}), 500
+    
+    if created:
+        ingest.enqueue([photo])
+    elif reused_blob:
+        ingest.catch_up([reused_blob])
+    return jsonify({'success': True, 'photo_id': photo.id, 'filename': photo.filename})
+
+def _upload_session_state(upload):
+    """JSON state of a chunked upload session"""
+    received = chunked_uploads.received_chunks(upload)
+    return {
+        'success': True,
+        'upload_id': upload.id,
+        'filename': upload.filename,
+        'size': upload.total_size,
+        'chunk_size': upload.chunk_size,
+        'chunk_count': upload.chunk_count,
+        'received_chunks': received,
+        'offset': chunked_uploads.contiguous_offset(upload, received),
+    }
+
 @app.route('/simple_upload/<int:project_id>')
 def simple_upload(project_id):
     """Simple upload page for testing"""
-    project = Project.query.get_or_404(project_id)
+    project = project_cache.get_project_or_404(project_id)
     return render_template('simple_upload.html', project=project)
 
 @app.route('/view_photos/<int:project_id>')
 def view_photos(project_id):
-    """View photos for a specific project"""
-    project = Project.query.get_or_404(project_id)
-    photos = Photo.query.filter_by(project_id=project_id).order_by(Photo.uploaded_at.desc()).all()
-    return render_template('view_photos.html', project=project, photos=photos)
+    """View photos for a specific project (first page, the rest loads via photo_list)"""
+    project = project_cache.get_project_or_404(project_id)
+    try:
+        photos, next_cursor = _photo_page(project_id, request.args.get('cursor'))
+    except ValueError:
+        abort(400)
+    return render_template('view_photos.html', project=project, photos=photos,
+                           next_cursor=next_cursor, photo_count=project.photo_count)
+
+@app.route('/photo_list/<int:project_id>')
+def photo_list(project_id):
+    """사진 목록 API (커서 기반 페이지네이션, 무한 스크롤용)"""
+    project_cache.get_project_or_404(project_id)
+    try:
+        limit = min(int(request.args.get('limit', app.config['PHOTOS_PER_PAGE'])), 200)
+    except ValueError:
+        return jsonify({'success': False, 'error': '잘못된 요청입니다.'}), 400
+    
+    try:
+        photos, next_cursor = _photo_page(project_id, request.args.get('cursor'), max(limit, 1))
+    except ValueError:
+        return jsonify({'success': False, 'error': '잘못된 커서입니다.'}), 400
+    
+    return jsonify({
+        'success': True,
+        'photos': [_photo_to_dict(photo) for photo in photos],
+        'next_cursor': next_cursor,
+    })
+
+@app.route('/search_photos')
+def search_photos():
+    """사진 검색 API (파일명/설명/위치 검색어, 촬영일 범위, 프로젝트 필터)"""
+    args = request.args
+    try:
+        limit = max(min(int(args.get('limit', app.config['PHOTOS_PER_PAGE'])), 200), 1)
+        project_id = int(args['project_id']) if args.get('project_id') else None
+        date_from = datetime.strptime(args['date_from'], '%Y-%m-%d').date() if args.get('date_from') else None
+        date_to = datetime.strptime(args['date_to'], '%Y-%m-%d').date() if args.get('date_to') else None
+    except ValueError:
+        return jsonify({'success': False, 'error': '잘못된 요청입니다.'}), 400
+    
+    query = search.photo_query(
+        terms=args.get('q', '').split(),
+        project_id=project_id,
+        date_from=date_from,
+        date_to=date_to,
+        location=args.get('location', '').strip() or None,
+    )
+    try:
+        photos, next_cursor = _keyset_page(query, args.get('cursor'), limit)
+    except ValueError:
+        return jsonify({'success': False, 'error': '잘못된 커서입니다.'}), 400
+    
+    return jsonify({
+        'success': True,
+        'photos': [_photo_to_dict(photo) for photo in photos],
+        'next_cursor': next_cursor,
+    })
+
+def _encode_cursor(photo):
+    """Opaque cursor pointing just after ``photo`` in (uploaded_at desc, id desc) order"""
+    raw = f"{photo.uploaded_at.isoformat()}|{photo.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def _decode_cursor(cursor):
+    """Inverse of _encode_cursor; raises ValueError on malformed input"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        uploaded_at, photo_id = raw.split('|')
+        return datetime.fromisoformat(uploaded_at), int(photo_id)
+    except (UnicodeDecodeError, binascii.Error) as e:
+        raise ValueError(str(e))
+
+def _photo_page(project_id, cursor=None, limit=None):
+    """Keyset-paginated photos of a project, newest first
+
+    Uses the (project_id, uploaded_at, id) index, so every page costs the
+    same no matter how deep into the project it is.
+    """
+    return _keyset_page(Photo.query.filter_by(project_id=project_id), cursor, limit)
+
+def _keyset_page(query, cursor=None, limit=None):
+    """One page of ``query`` in (uploaded_at desc, id desc) order plus the next cursor"""
+    limit = limit or app.config['PHOTOS_PER_PAGE']
+    if cursor:
+        uploaded_at, photo_id = _decode_cursor(cursor)
+        query = query.filter(tuple_(Photo.uploaded_at, Photo.id) < tuple_(uploaded_at, photo_id))
+    photos = query.order_by(Photo.uploaded_at.desc(), Photo.id.desc()).limit(limit + 1).all()
+    
+    next_cursor = None
+    if len(photos) > limit:
+        photos = photos[:limit]
+        next_cursor = _encode_cursor(photos[-1])
+    return photos, next_cursor
+
+def _photo_to_dict(photo):
+    """JSON representation of a photo for listing APIs"""
+    return {
+        'id': photo.id,
+        'project_id': photo.project_id,
+        'filename': photo.filename,
+        'description': photo.description,
+        'photo_location': photo.photo_location,
+        'photo_date': photo.photo_date.isoformat() if photo.photo_date else None,
+        'uploaded_at': photo.uploaded_at.isoformat() if photo.uploaded_at else None,
+        'status': photo.status,
+        'taken_at': photo.taken_at.isoformat() if photo.taken_at else None,
+        'gps': [photo.gps_lat, photo.gps_lon] if photo.gps_lat is not None and photo.gps_lon is not None else None,
+        'camera': ' '.join(filter(None, (photo.camera_make, photo.camera_model))) or None,
+        'width': photo.original_width,
+        'height': photo.original_height,
+        'thumbnail_url': url_for('photo_thumbnail', photo_id=photo.id),
+        'preview_url': url_for('photo_preview', photo_id=photo.id),
+        'full_url': url_for('photo_full', photo_id=photo.id),
+    }
 
 @app.route('/download_photo/<int:photo_id>')
 def download_photo(photo_id):
     """Download a single photo"""
     photo = Photo.query.get_or_404(photo_id)
     
-    if not os.path.exists(photo.filepath):
+    if not storage.exists(photo.filepath):
         flash('파일을 찾을 수 없습니다.', 'error')
         return redirect(url_for('view_photos', project_id=photo.project_id))
     
-    return send_file(photo.filepath, as_attachment=True, download_name=photo.filename)
+    return _send_original(photo, as_attachment=True)
+
+def _send_original(photo, as_attachment=False):
+    """Send an original with a strong ETag, 304 and Range support
+
+    Finished photos never change under their URL, so they are cached as
+    immutable. With SENDFILE_MODE set only headers are returned and the
+    front proxy streams the file, freeing the worker immediately. Backends
+    that serve files themselves (S3) get a redirect to a signed URL instead.
+    """
+    download_name = photo.filename if as_attachment else None
+    fallback = f"photo_{photo.id}{os.path.splitext(photo.filename)[1]}"
+    if photo.status != Photo.STATUS_PENDING:
+        direct_url = storage.url(photo.filepath, _attachment_disposition(download_name, fallback)
+                                 if as_attachment else None)
+        if direct_url:
+            return redirect(direct_url)
+    
+    path = storage.local_path(photo.filepath)
+    stat = os.stat(path)
+    etag = f"{photo.blob_hash or photo.id}-{stat.st_mtime_ns:x}-{stat.st_size:x}"
+    # 블롭 파일에는 확장자가 없으므로 원래 파일명으로 형식 판단
+    mimetype = (mimetypes.guess_type(photo.filename)[0] or mimetypes.guess_type(path)[0]
+                or 'application/octet-stream')
+    
+    accel_uri = _accel_uri(photo, path) if app.config['SENDFILE_MODE'] == 'x-accel-redirect' else None
+    if accel_uri:
+        # nginx가 internal location에서 Range/조건부 요청까지 처리
+        response = Response(mimetype=mimetype)
+        response.headers['X-Accel-Redirect'] = accel_uri
+        if as_attachment:
+            response.headers['Content-Disposition'] = _attachment_disposition(download_name, fallback)
+        response.set_etag(etag)
+        response.last_modified = stat.st_mtime
+        response.make_conditional(request)
+    else:
+        # x-sendfile 모드는 USE_X_SENDFILE 설정으로 send_file이 처리
+        response = send_file(path, mimetype=mimetype, as_attachment=as_attachment,
+                             download_name=download_name, etag=etag, last_modified=stat.st_mtime, conditional=True)
+    
+    if photo.status == Photo.STATUS_READY and not as_attachment:
+        response.headers['Cache-Control'] = f"public, max-age={app.config['PHOTO_CACHE_MAX_AGE']}, immutable"
+    else:
+        # 압축 대기 중이거나 파일명이 바뀔 수 있는 다운로드는 매번 ETag로 재검증
+        response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+def _accel_uri(photo, path):
+    """nginx internal URI of an original, or None if no accel location maps its file
+
+    Storage keys are relative to STORAGE_ROOT (SENDFILE_STORAGE_PREFIX);
+    files recorded by path before keys existed live under UPLOAD_FOLDER
+    (SENDFILE_ACCEL_PREFIX). Cached copies of S3 objects are sent directly.
+    """
+    if storage.is_key(photo.filepath):
+        if not storage.stored_locally(photo.filepath):
+            return None
+        prefix, relative = app.config['SENDFILE_STORAGE_PREFIX'], photo.filepath
+    else:
+        relative = os.path.relpath(os.path.abspath(path), os.path.abspath(app.config['UPLOAD_FOLDER']))
+        if relative.startswith(os.pardir):
+            return None
+        prefix, relative = app.config['SENDFILE_ACCEL_PREFIX'], relative.replace(os.sep, '/')
+    return prefix.rstrip('/') + '/' + quote(relative)
+
+def _attachment_disposition(filename, fallback):
+    """Content-Disposition with an ASCII fallback and the UTF-8 name (RFC 5987)"""
+    return f"attachment; filename={fallback}; filename*=UTF-8''{quote(filename)}"
 
 @app.route('/download_all_photos/<int:project_id>')
 def download_all_photos(project_id):
-    """Download all photos for a project as ZIP file"""
+    """Download all photos for a project as ZIP file (streamed)"""
     project = Project.query.get_or_404(project_id)
-    photos = Photo.query.filter_by(project_id=project_id).all()
-    
-    if not photos:
-        flash('다운로드할 사진이 없습니다.', 'error')
-        return redirect(url_for('view_photos', project_id=project_id))
-    
-    # Create temporary ZIP file
-    temp_dir = tempfile.mkdtemp()
     zip_filename = f"{project.name}_작업사진.zip"
-    zip_path = os.path.join(temp_dir, zip_filename)
     
-    try:
-        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            for photo in photos:
-                if os.path.exists(photo.filepath):
-                    zipf.write(photo.filepath, photo.filename)
-        
-        return send_file(zip_path, as_attachment=True, download_name=zip_filename, 
-                        mimetype='application/zip')
+    # 변경이 없으면 캐시된 스냅샷을 그대로 전송 (Range/조건부 요청 지원)
+    snapshot = archives.cached_snapshot(project) if app.config['ARCHIVE_SNAPSHOTS'] else None
+    if snapshot:
+        response = send_file(snapshot, mimetype='application/zip', etag=f"{project_id}-r{project.revision}",
+                             conditional=True)
+        response.headers['Content-Disposition'] = _attachment_disposition(zip_filename, f"project_{project_id}.zip")
+        return response
     
-    except Exception as e:
-        app.logger.error(f"Error creating ZIP file: {e}")
-        flash('ZIP 파일 생성 중 오류가 발생했습니다.', 'error')
+    members = archives.project_members(project_id)
+    if not members:
+        flash('다운로드할 사진이 없습니다.', 'error')
         return redirect(url_for('view_photos', project_id=project_id))
     
-    finally:
-        # Cleanup temporary directory
+    # 이번 요청은 바로 스트리밍하고, 다음 요청을 위해 스냅샷은 백그라운드에서 증분 생성
+    if app.config['ARCHIVE_SNAPSHOTS']:
+        archives.schedule_snapshot(project_id)
+    
+    def generate():
         try:
-            shutil.rmtree(temp_dir)
-        except:
-            pass
+            yield from archives.stream_zip(members)
+        except Exception as e:
+            # 응답이 이미 시작되었으므로 로그만 남기고 연결 종료
+            app.logger.error(f"Error streaming ZIP file: {e}")
+            raise
+    
+    response = Response(stream_with_context(generate()), mimetype='application/zip')
+    response.headers['Content-Disposition'] = _attachment_disposition(zip_filename, f"project_{project_id}.zip")
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
 
 @app.route('/delete_photo/<int:photo_id>', methods=['POST'])
 def delete_photo(photo_id):
@@ -299,13 +618,15 @@ def delete_photo(photo_id):
     project_id = photo.project_id
     
     try:
-        # Delete file from filesystem
-        if os.path.exists(photo.filepath):
-            os.remove(photo.filepath)
+        # 다른 사진이 같은 파일을 참조하지 않을 때만 파일 삭제
+        released = blobs.release([photo])
+        renditions.invalidate(photo)
         
         # Delete from database
         db.session.delete(photo)
+        project_stats.refresh(project_id)
         db.session.commit()
+        blobs.unlink(released)
         
         flash('사진이 성공적으로 삭제되었습니다.', 'success')
     
@@ -318,24 +639,14 @@ def delete_photo(photo_id):
 
 @app.route('/delete_all_photos/<int:project_id>', methods=['POST'])
 def delete_all_photos(project_id):
-    """Delete all photos for a project"""
-    project = Project.query.get_or_404(project_id)
-    photos = Photo.query.filter_by(project_id=project_id).all()
+    """Delete all photos for a project (files are removed in the background)"""
+    project_cache.get_project_or_404(project_id)
     
     try:
-        # Delete files from filesystem
-        for photo in photos:
-            if os.path.exists(photo.filepath):
-                os.remove(photo.filepath)
-        
-        # Delete from database
-        Photo.query.filter_by(project_id=project_id).delete()
+        deletions.queue_project_photos(project_id)
+        project_stats.refresh(project_id)
         db.session.commit()
-        
-        # Remove project directory if empty
-        project_dir = os.path.join(app.config['UPLOAD_FOLDER'], str(project_id))
-        if os.path.exists(project_dir) and not os.listdir(project_dir):
-            os.rmdir(project_dir)
+        deletions.wake()
         
         flash('모든 사진이 성공적으로 삭제되었습니다.', 'success')
     
@@ -382,6 +693,7 @@ def edit_photo(photo_id):
             else:
                 photo.photo_date = None
             
+            project_stats.touch(photo.project_id)
             db.session.commit()
             flash('사진 정보가 성공적으로 수정되었습니다.', 'success')
             
@@ -433,18 +745,23 @@ def batch_edit_photos(project_id):
                 flash('날짜 형식이 올바르지 않습니다. (YYYY-MM-DD)', 'error')
                 return redirect(url_for('view_photos', project_id=project_id))
         
-        # Update photos
+        # Update photos (단일 UPDATE ... WHERE id IN (...))
+        values = {}
+        if update_location:
+            values[Photo.photo_location] = new_location
+        if update_date:
+            values[Photo.photo_date] = new_date
+        if update_description:
+            values[Photo.description] = new_description
+        
         updated_count = 0
-        for photo_id in photo_ids:
-            photo = Photo.query.filter_by(id=photo_id, project_id=project_id).first()
-            if photo:
-                if update_location:
-                    photo.photo_location = new_location
-                if update_date:
-                    photo.photo_date = new_date
-                if update_description:
-                    photo.description = new_description
-                updated_count += 1
+        if values:
+            updated_count = Photo.query.filter(
+                Photo.id.in_(photo_ids),
+                Photo.project_id == project_id
+            ).update(values, synchronize_session=False)
+        if updated_count:
+            project_stats.touch(project_id)
         
         db.session.commit()
         
@@ -480,6 +797,7 @@ def rename_photo(photo_id):
     try:
         # Update filename in database
         photo.filename = new_name
+        project_stats.touch(photo.project_id)
         db.session.commit()
         
         if request.is_json or 'XMLHttpRequest' in request.headers.get('X-Requested-With', ''):
@@ -510,15 +828,21 @@ def batch_rename():
         return redirect(url_for('view_photos', project_id=project_id))
     
     try:
-        for photo_id, new_name in zip(photo_ids, new_names):
-            photo = Photo.query.get(photo_id)
-            if photo:
-                # Add extension if not provided
-                if '.' not in new_name:
-                    old_ext = os.path.splitext(photo.filename)[1]
-                    new_name += old_ext
-                
-                photo.filename = new_name
+        requested = {int(photo_id): new_name.strip() for photo_id, new_name in zip(photo_ids, new_names)}
+        
+        # 기존 파일명을 한 번에 조회한 뒤 executemany UPDATE로 일괄 변경
+        current = db.session.query(Photo.id, Photo.filename).filter(
+            Photo.id.in_(list(requested)),
+            Photo.project_id == project_id
+        ).all()
+        rows = [
+            {'id': photo_id, 'filename': _with_extension(requested[photo_id], old_filename)}
+            for photo_id, old_filename in current
+            if requested[photo_id]
+        ]
+        if rows:
+            db.session.execute(update(Photo), rows)
+            project_stats.touch(project_id)
         
         db.session.commit()
         flash('모든 파일명이 성공적으로 변경되었습니다.', 'success')
@@ -530,10 +854,112 @@ def batch_rename():
     
     return redirect(url_for('view_photos', project_id=project_id))
 
+@app.route('/bulk_edit_photos/<int:project_id>', methods=['POST'])
+def bulk_edit_photos(project_id):
+    """대량 사진 정보 수정 API
+
+    JSON body: {"edits": [{"id": 1, "filename": ..., "photo_location": ...,
+    "photo_date": "YYYY-MM-DD", "description": ...}, ...]}. Only the keys
+    present in an edit are changed. Returns one result per edit.
+    """
+    project_cache.get_project_or_404(project_id)
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data, dict):
+        return jsonify({'success': False, 'error': '요청 형식이 올바르지 않습니다.'}), 400
+    edits = data.get('edits')
+    if not isinstance(edits, list) or not edits:
+        return jsonify({'success': False, 'error': '수정할 항목이 없습니다.'}), 400
+    
+    ids = []
+    for edit in edits:
+        try:
+            ids.append(int(edit.get('id')))
+        except (AttributeError, TypeError, ValueError):
+            ids.append(None)
+    
+    current = dict(db.session.query(Photo.id, Photo.filename).filter(
+        Photo.id.in_([photo_id for photo_id in ids if photo_id is not None]),
+        Photo.project_id == project_id
+    ).all())
+    
+    results = []
+    rows = {}
+    for photo_id, edit in zip(ids, edits):
+        if photo_id not in current:
+            results.append({'id': photo_id, 'success': False, 'error': '사진을 찾을 수 없습니다.'})
+            continue
+        try:
+            row = _bulk_edit_values(edit, current[photo_id])
+        except ValueError as e:
+            results.append({'id': photo_id, 'success': False, 'error': str(e)})
+            continue
+        if 'filename' in row:
+            current[photo_id] = row['filename']
+        rows.setdefault(photo_id, {'id': photo_id}).update(row)
+        results.append({'id': photo_id, 'success': True})
+    
+    try:
+        # 변경되는 컬럼 조합별로 executemany 한 번씩 실행
+        groups = {}
+        for row in rows.values():
+            groups.setdefault(tuple(sorted(row)), []).append(row)
+        for group in groups.values():
+            db.session.execute(update(Photo), group)
+        if rows:
+            project_stats.touch(project_id)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        app.logger.error(f"Error in bulk edit: {e}")
+        return jsonify({'success': False, 'error': '일괄 수정 중 오류가 발생했습니다.'}), 500
+    
+    return jsonify({
+        'success': True,
+        'updated': sum(1 for result in results if result['success']),
+        'results': results,
+    })
+
+def _bulk_edit_values(edit, old_filename):
+    """Validate one bulk edit and return the column values to update"""
+    values = {}
+    if 'filename' in edit:
+        filename = _bulk_edit_text(edit, 'filename')
+        if not filename:
+            raise ValueError('새 파일명을 입력해주세요.')
+        values['filename'] = _with_extension(filename, old_filename)
+    if 'photo_location' in edit:
+        values['photo_location'] = _bulk_edit_text(edit, 'photo_location') or None
+    if 'description' in edit:
+        values['description'] = _bulk_edit_text(edit, 'description') or None
+    if 'photo_date' in edit:
+        photo_date = _bulk_edit_text(edit, 'photo_date')
+        try:
+            values['photo_date'] = datetime.strptime(photo_date, '%Y-%m-%d').date() if photo_date else None
+        except ValueError:
+            raise ValueError('날짜 형식이 올바르지 않습니다. (YYYY-MM-DD)')
+    return values
+
+def _bulk_edit_text(edit, key):
+    """Stripped string value of one field; raises ValueError for other types or overlong text"""
+    value = edit[key] or ''
+    if not isinstance(value, str):
+        raise ValueError(f'{key} 값은 문자열이어야 합니다.')
+    value = value.strip()
+    max_length = getattr(Photo.__table__.c[key].type, 'length', None)
+    if max_length and len(value) > max_length:
+        raise ValueError(f'{key} 값은 {max_length}자 이하로 입력해주세요.')
+    return value
+
+def _with_extension(new_name, old_filename):
+    """Add the old file extension if the new name has none"""
+    if '.' not in new_name:
+        new_name += os.path.splitext(old_filename)[1]
+    return new_name
+
 @app.route('/export_album/<int:project_id>')
 def export_album(project_id):
     """Export project photos as construction completion album"""
-    project = Project.query.get_or_404(project_id)
+    project = project_cache.get_project_or_404(project_id)
     photos = Photo.query.filter_by(project_id=project_id).order_by(Photo.uploaded_at.asc()).all()
     
     if not photos:
@@ -545,28 +971,42 @@ def export_album(project_id):
     
     return render_template('photo_album.html', project=project, photos=photos, current_date=current_date)
 
+@app.route('/export_album_pdf/<int:project_id>')
+def export_album_pdf(project_id):
+    """준공사진첩 PDF 다운로드 (백그라운드에서 생성, 사진이 바뀔 때까지 캐시)"""
+    project = project_cache.get_project_or_404(project_id)
+    
+    path = albums.current_album(project_id)
+    if path is None:
+        flash('내보낼 사진이 없습니다.', 'error')
+        return redirect(url_for('view_photos', project_id=project_id))
+    
+    if not os.path.exists(path):
+        # 작은 프로젝트는 잠시 기다려 바로 전송하고, 큰 프로젝트는 완료 후 다시 요청하도록 안내
+        done = albums.schedule_album(project_id)
+        if not done.wait(app.config['ALBUM_BUILD_WAIT']):
+            flash('준공사진첩을 만드는 중입니다. 잠시 후 다시 다운로드해주세요.', 'info')
+            return redirect(url_for('view_photos', project_id=project_id))
+        if not os.path.exists(path):
+            flash('준공사진첩 생성 중 오류가 발생했습니다.', 'error')
+            return redirect(url_for('view_photos', project_id=project_id))
+    
+    return send_file(path, as_attachment=True, download_name=f"{project.name}_준공사진첩.pdf",
+                     mimetype='application/pdf')
+
 @app.route('/delete_project/<int:project_id>', methods=['POST'])
 def delete_project(project_id):
-    """Delete a project and all its photos"""
+    """Delete a project and all its photos (files are removed in the background)"""
     project = Project.query.get_or_404(project_id)
+    project_name = project.name
     
     try:
-        # Delete all photos and files
-        photos = Photo.query.filter_by(project_id=project_id).all()
-        for photo in photos:
-            if os.path.exists(photo.filepath):
-                os.remove(photo.filepath)
-        
-        # Remove project directory
-        project_dir = os.path.join(app.config['UPLOAD_FOLDER'], str(project_id))
-        if os.path.exists(project_dir):
-            shutil.rmtree(project_dir)
-        
-        # Delete from database (cascade will handle photos)
-        db.session.delete(project)
+        deletions.queue_project(project_id)
         db.session.commit()
+        project_cache.invalidate(project_id)
+        deletions.wake()
         
-        flash(f'프로젝트 "{project.name}"이 성공적으로 삭제되었습니다.', 'success')
+        flash(f'프로젝트 "{project_name}"이 성공적으로 삭제되었습니다.', 'success')
     
     except Exception as e:
         db.session.rollback()
@@ -578,39 +1018,224 @@ def delete_project(project_id):
 @app.route('/photo_thumbnail/<int:photo_id>')
 def photo_thumbnail(photo_id):
     """Serve photo thumbnails"""
+    return _serve_rendition(photo_id, 'thumb')
+
+@app.route('/photo_preview/<int:photo_id>')
+def photo_preview(photo_id):
+    """Serve medium-size preview images"""
+    return _serve_rendition(photo_id, 'preview')
+
+def _serve_rendition(photo_id, size):
+    """Serve a cached rendition, generating it on first request"""
     photo = Photo.query.get_or_404(photo_id)
     
-    if not os.path.exists(photo.filepath):
-        abort(404)
+    # 압축 대기 중인 사진은 원본을 디코딩하지 않고 임시 이미지 반환
+    if photo.status == Photo.STATUS_PENDING:
+        response = send_file(io.BytesIO(_pending_placeholder(size)), mimetype='image/jpeg')
+        response.headers['Cache-Control'] = 'no-store'
+        return response
     
+    # Accept 헤더에 명시된 포맷 중 선호 순서대로 선택 (AVIF > WebP > JPEG)
+    accepted = {value for value, quality in request.accept_mimetypes if quality > 0}
+    fmt = renditions.negotiate(accepted)
+    # 캐시 적중 시에는 원본 존재 여부도 확인하지 않음 (S3 요청 없음)
     try:
-        # Create thumbnail
-        with Image.open(photo.filepath) as img:
-            img.thumbnail((300, 300), Image.Resampling.LANCZOS)
-            img_io = io.BytesIO()
-            img_format = img.format or 'JPEG'
-            img.save(img_io, format=img_format)
-            img_io.seek(0)
-            return send_file(img_io, mimetype=f'image/{img_format.lower()}')
+        path = renditions.get_rendition(photo, size, fmt)
+        response = send_file(path, mimetype=renditions.mimetype(fmt))
+        response.vary.add('Accept')
+        return response
     
+    except FileNotFoundError:
+        abort(404)
     except Exception as e:
         app.logger.error(f"Error creating thumbnail: {e}")
         abort(404)
 
+_placeholders = {}
+
+def _pending_placeholder(size):
+    """Small grey JPEG shown while a photo is still being processed"""
+    if size not in _placeholders:
+        from PIL import Image
+        width, height = renditions.RENDITION_SIZES[size]
+        img_io = io.BytesIO()
+        Image.new('RGB', (width, height), (222, 226, 230)).save(img_io, 'JPEG', quality=60)
+        _placeholders[size] = img_io.getvalue()
+    return _placeholders[size]
+
+@app.route('/photo_sprite/<int:project_id>')
+def photo_sprite(project_id):
+    """한 페이지 분량 썸네일을 하나의 이미지로 합친 스프라이트 정보 API
+
+    Takes the same cursor/limit as photo_list and returns the page's photos,
+    each with its tile offset, plus the sprite image URL, so a gallery page
+    needs one JSON and one image request.
+    """
+    project_cache.get_project_or_404(project_id)
+    try:
+        limit = max(min(int(request.args.get('limit', app.config['PHOTOS_PER_PAGE'])), 200), 1)
+        photos, next_cursor = _photo_page(project_id, request.args.get('cursor'), limit)
+    except ValueError:
+        return jsonify({'success': False, 'error': '잘못된 요청입니다.'}), 400
+    
+    tile = app.config['SPRITE_TILE_SIZE']
+    width, height, positions = sprites.layout(len(photos))
+    key = sprites.fingerprint(photos)
+    items = []
+    for photo, (x, y) in zip(photos, positions):
+        item = _photo_to_dict(photo)
+        item['sprite'] = {'x': x, 'y': y, 'width': tile, 'height': tile}
+        items.append(item)
+    
+    return jsonify({
+        'success': True,
+        'sprite_url': url_for('photo_sprite_image', project_id=project_id,
+                              ids=','.join(str(photo.id) for photo in photos), v=key),
+        'width': width,
+        'height': height,
+        'tile_size': tile,
+        'photos': items,
+        'next_cursor': next_cursor,
+    })
+
+@app.route('/photo_sprite/<int:project_id>/image')
+def photo_sprite_image(project_id):
+    """스프라이트 이미지 (Accept 헤더에 따라 AVIF/WebP/JPEG)"""
+    try:
+        ids = [int(photo_id) for photo_id in request.args.get('ids', '').split(',') if photo_id]
+    except ValueError:
+        abort(400)
+    if not ids or len(ids) > 200:
+        abort(400)
+    
+    found = {photo.id: photo for photo in Photo.query.filter(Photo.project_id == project_id, Photo.id.in_(ids))}
+    photos = [found[photo_id] for photo_id in ids if photo_id in found]
+    if not photos:
+        abort(404)
+    
+    accepted = {value for value, quality in request.accept_mimetypes if quality > 0}
+    fmt = renditions.negotiate(accepted)
+    try:
+        path, _ = sprites.get_sprite(project_id, photos, fmt)
+    except Exception as e:
+        app.logger.error(f"Error creating sprite: {e}")
+        abort(500)
+    
+    response = send_file(path, mimetype=renditions.mimetype(fmt))
+    response.vary.add('Accept')
+    # 사진 구성이 그대로면(v 일치) URL 내용이 바뀌지 않음
+    if len(photos) == len(ids) and request.args.get('v') == sprites.fingerprint(photos):
+        response.headers['Cache-Control'] = f"public, max-age={app.config['PHOTO_CACHE_MAX_AGE']}, immutable"
+    else:
+        response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+@app.route('/photo_status/<int:project_id>')
+def photo_status(project_id):
+    """업로드 처리 상태 조회 API (UI 폴링용)"""
+    project_cache.get_project_or_404(project_id)
+    pending_ids = [photo_id for (photo_id,) in db.session.query(Photo.id).filter_by(
+        project_id=project_id, status=Photo.STATUS_PENDING)]
+    return jsonify({'pending': len(pending_ids), 'pending_ids': pending_ids})
+
+@app.route('/duplicate_clusters/<int:project_id>')
+def duplicate_clusters(project_id):
+    """유사(중복) 사진 묶음 조회 API
+
+    Each cluster lists its photos and the id suggested to keep. ``distance``
+    overrides DUPLICATE_MAX_DISTANCE (bits out of 64).
+    """
+    project_cache.get_project_or_404(project_id)
+    try:
+        max_distance = min(int(request.args.get('distance', app.config['DUPLICATE_MAX_DISTANCE'])), 16)
+    except ValueError:
+        return jsonify({'success': False, 'error': '잘못된 요청입니다.'}), 400
+    
+    groups = duplicates.clusters(project_id, max_distance)
+    photos = {photo.id: photo for photo in Photo.query.filter(
+        Photo.id.in_([photo_id for group in groups for photo_id in group]))}
+    result = []
+    for group in groups:
+        members = [photos[photo_id] for photo_id in group if photo_id in photos]
+        if len(members) < 2:
+            continue
+        result.append({
+            'keep': duplicates.best_photo(members).id,
+            'photos': [_photo_to_dict(photo) for photo in members],
+        })
+    return jsonify({'success': True, 'clusters': result, 'distance': max_distance})
+
+@app.route('/similar_photos/<int:photo_id>')
+def similar_photos(photo_id):
+    """특정 사진과 유사한 사진 목록 API"""
+    photo = Photo.query.get_or_404(photo_id)
+    matches = duplicates.similar_to(photo)
+    photos = {match.id: match for match in Photo.query.filter(Photo.id.in_([match_id for _, match_id in matches]))}
+    return jsonify({
+        'success': True,
+        'photos': [dict(_photo_to_dict(photos[match_id]), distance=d) for d, match_id in matches if match_id in photos],
+    })
+
+@app.route('/duplicate_clusters/<int:project_id>/keep_best', methods=['POST'])
+def keep_best_duplicates(project_id):
+    """유사 사진 묶음마다 가장 좋은 사진만 남기고 나머지 삭제
+
+    JSON body: {"clusters": [[id, id, ...], ...]} as returned by
+    duplicate_clusters (ids outside the project are ignored). The clusters
+    must be given explicitly so only groups the user reviewed are deleted.
+    """
+    project_cache.get_project_or_404(project_id)
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data, dict):
+        return jsonify({'success': False, 'error': '요청 형식이 올바르지 않습니다.'}), 400
+    groups = data.get('clusters')
+    if not isinstance(groups, list) or not all(
+            isinstance(group, list) and all(type(photo_id) is int for photo_id in group) for group in groups):
+        return jsonify({'success': False, 'error': 'clusters는 사진 ID 목록의 목록이어야 합니다.'}), 400
+    
+    photos = {photo.id: photo for photo in Photo.query.filter(
+        Photo.project_id == project_id,
+        Photo.id.in_([photo_id for group in groups for photo_id in group]))}
+    kept, doomed = [], {}
+    for group in groups:
+        members = [photos[photo_id] for photo_id in dict.fromkeys(group) if photo_id in photos]
+        if len(members) < 2:
+            continue
+        best = duplicates.best_photo(members)
+        kept.append(best.id)
+        doomed.update((photo.id, photo) for photo in members if photo is not best)
+    # 다른 묶음에서 남기기로 한 사진은 삭제하지 않음
+    doomed = [photo for photo_id, photo in doomed.items() if photo_id not in kept]
+    
+    try:
+        released = blobs.release(doomed)
+        for photo in doomed:
+            renditions.invalidate(photo)
+            db.session.delete(photo)
+        project_stats.refresh(project_id)
+        db.session.commit()
+        blobs.unlink(released)
+    except Exception as e:
+        db.session.rollback()
+        app.logger.error(f"Error removing duplicate photos: {e}")
+        return jsonify({'success': False, 'error': '중복 사진 삭제 중 오류가 발생했습니다.'}), 500
+    
+    return jsonify({'success': True, 'kept': kept, 'deleted': [photo.id for photo in doomed]})
+
 @app.route('/photo_full/<int:photo_id>')
 def photo_full(photo_id):
     """Serve full-size photos"""
     photo = Photo.query.get_or_404(photo_id)
     
-    if not os.path.exists(photo.filepath):
+    if not storage.exists(photo.filepath):
         abort(404)
     
-    return send_file(photo.filepath)
+    return _send_original(photo)
 
 @app.route('/manage_addresses')
 def manage_addresses():
     """현장주소 관리 페이지"""
-    projects = Project.query.order_by(Project.created_at.desc()).all()
+    projects = project_cache.project_list()
     return render_template('manage_addresses.html', projects=projects)
 
 @app.route('/edit_project/<int:project_id>', methods=['GET', 'POST'])
@@ -644,8 +1269,10 @@ def edit_project(project_id):
             project.manager_name = manager_name if manager_name else None
             project.manager_phone = manager_phone if manager_phone else None
             project.manager_email = manager_email if manager_email else None
+            project_stats.touch(project_id)
             
             db.session.commit()
+            project_cache.invalidate(project_id)
             flash('프로젝트 정보가 성공적으로 수정되었습니다.', 'success')
             return redirect(url_for('manage_addresses'))
         
@@ -666,6 +1293,7 @@ def quick_update_description(photo_id):
         description = data.get('description', '').strip()
         
         photo.description = description
+        project_stats.touch(photo.project_id)
         db.session.commit()
         
         return jsonify({'success': True, 'message': '설명이 업데이트되었습니다.'})
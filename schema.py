@@ -0,0 +1,109 @@
+"""Out-of-band schema setup.
+
+``flask migrate-db`` creates missing tables, adds columns that were added to
+the models after a table was created (create_all() never alters tables) and
+installs the search indexes. Only additive changes are made; it is safe to
+run on every deploy (e.g. the Heroku release phase) and is no longer run by
+each web process at startup.
+"""
+import click
+from sqlalchemy import inspect, text
+from app import app, db
+import models
+import search
+
+
+def _column_ddl(table, column):
+    dialect = db.engine.dialect
+    quote = dialect.identifier_preparer.quote
+    ddl = f"ALTER TABLE {quote(table.name)} ADD COLUMN {quote(column.name)} {column.type.compile(dialect=dialect)}"
+    default = column.server_default
+    if default is not None:
+        value = default.arg if isinstance(default.arg, str) else default.arg.text
+        ddl += " DEFAULT '{}'".format(value.replace("'", "''"))
+        if not column.nullable:
+            # 기존 행은 DEFAULT 값으로 채워지므로 NOT NULL 가능
+            ddl += " NOT NULL"
+    return ddl
+
+
+def plan():
+    """DDL statements needed to bring existing tables up to the models"""
+    inspector = inspect(db.engine)
+    existing = set(inspector.get_table_names())
+    statements = []
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing:
+            continue
+        columns = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in columns:
+                statements.append(_column_ddl(table, column))
+    return statements
+
+
+def missing_indexes():
+    """Model indexes that do not exist yet on existing tables"""
+    inspector = inspect(db.engine)
+    existing = set(inspector.get_table_names())
+    missing = []
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing:
+            continue
+        names = {index['name'] for index in inspector.get_indexes(table.name)}
+        missing.extend(index for index in table.indexes if index.name not in names)
+    return missing
+
+
+def pending():
+    """Descriptions of every change migrate() would make (tables, columns, indexes)"""
+    inspector = inspect(db.engine)
+    changes = [f"create table {table.name}" for table in db.metadata.sorted_tables
+               if not inspector.has_table(table.name)]
+    changes += plan()
+    changes += [f"create index {index.name}" for index in missing_indexes()]
+    return changes
+
+
+def migrate():
+    """Apply every pending change; returns a description of each one"""
+    inspector = inspect(db.engine)
+    new_tables = [table.name for table in db.metadata.sorted_tables if not inspector.has_table(table.name)]
+    statements = plan()
+    changes = [f"create table {name}" for name in new_tables] + statements
+
+    for statement in statements:
+        db.session.execute(text(statement))
+    db.session.commit()
+    # 새 컬럼에 걸린 인덱스는 컬럼 추가 후에 생성
+    for index in missing_indexes():
+        index.create(bind=db.engine)
+        changes.append(f"create index {index.name}")
+    # 새 테이블과 그 인덱스
+    db.create_all()
+
+    # 검색 인덱스 (Postgres pg_trgm / SQLite FTS5)
+    search.install()
+    return changes
+
+
+@app.cli.command('migrate-db')
+@click.option('--dry-run', is_flag=True, help='Only print the changes that would be made')
+@click.option('--check', is_flag=True, help='Exit non-zero if the schema is behind the models (for deploy gates)')
+def migrate_db(dry_run, check):
+    """Create missing tables, columns and indexes
+
+    Only compares the live schema with the models, so a database created by
+    any earlier version of the app is brought up to date in one run.
+    """
+    if dry_run or check:
+        changes = pending()
+        for change in changes:
+            click.echo(change)
+        if check and changes:
+            raise click.ClickException(f"Schema is behind the models ({len(changes)} changes); run flask migrate-db")
+        return
+    changes = migrate()
+    for change in changes:
+        click.echo(change)
+    click.echo(f"Schema up to date ({len(changes)} changes)")
@@ -0,0 +1,134 @@
+"""Photo search over filename, description and location.
+
+Postgres uses pg_trgm GIN indexes so ``ILIKE '%term%'`` is index-backed;
+trigrams also work for Korean, which the built-in full-text configurations
+cannot stem. SQLite (local use) gets an external-content FTS5 table with the
+trigram tokenizer, kept in sync with the photo table by triggers. Other
+databases, or setups where the index could not be installed, fall back to
+plain LIKE scans.
+"""
+from sqlalchemy import bindparam, column, literal_column, select, table, text
+from sqlalchemy.exc import DBAPIError
+from app import app, db
+from models import Photo
+
+# 인덱스 표현식과 질의 표현식이 글자 그대로 같아야 Postgres가 인덱스를 사용함
+SEARCH_EXPRESSION = ("coalesce(photo.filename, '') || ' ' || coalesce(photo.description, '') "
+                     "|| ' ' || coalesce(photo.photo_location, '')")
+
+POSTGRES_DDL = (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_photo_search_trgm ON photo USING gin "
+    f"(({SEARCH_EXPRESSION.replace('photo.', '')}) gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_photo_location_trgm ON photo USING gin (photo_location gin_trgm_ops)",
+)
+
+SQLITE_DDL = (
+    "CREATE VIRTUAL TABLE photo_fts USING fts5(filename, description, photo_location, "
+    "content='photo', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS photo_fts_ai AFTER INSERT ON photo BEGIN "
+    "INSERT INTO photo_fts(rowid, filename, description, photo_location) "
+    "VALUES (new.id, new.filename, new.description, new.photo_location); END",
+    "CREATE TRIGGER IF NOT EXISTS photo_fts_ad AFTER DELETE ON photo BEGIN "
+    "INSERT INTO photo_fts(photo_fts, rowid, filename, description, photo_location) "
+    "VALUES ('delete', old.id, old.filename, old.description, old.photo_location); END",
+    "CREATE TRIGGER IF NOT EXISTS photo_fts_au AFTER UPDATE OF filename, description, photo_location ON photo BEGIN "
+    "INSERT INTO photo_fts(photo_fts, rowid, filename, description, photo_location) "
+    "VALUES ('delete', old.id, old.filename, old.description, old.photo_location); "
+    "INSERT INTO photo_fts(rowid, filename, description, photo_location) "
+    "VALUES (new.id, new.filename, new.description, new.photo_location); END",
+    # 기존 사진 색인
+    "INSERT INTO photo_fts(photo_fts) VALUES ('rebuild')",
+)
+
+TRIGRAM_MIN_LENGTH = 3  # 이보다 짧은 검색어는 trigram 인덱스를 쓸 수 없음
+
+photo_fts = table('photo_fts', column('rowid'))
+
+_fts_ready = None  # SQLite에 FTS 테이블이 있는지 (첫 검색 때 확인)
+
+
+def _sqlite_fts_exists():
+    return db.session.execute(text(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'photo_fts'")).first() is not None
+
+
+def install():
+    """Create the search indexes for the current database if they are missing
+
+    Called by schema.migrate() after the tables exist. Failures (e.g. no
+    permission to create the pg_trgm extension, or SQLite built without
+    FTS5) are logged and search falls back to unindexed LIKE.
+    """
+    global _fts_ready
+    dialect = db.engine.dialect.name
+    try:
+        if dialect == 'postgresql':
+            for statement in POSTGRES_DDL:
+                db.session.execute(text(statement))
+        elif dialect == 'sqlite':
+            if not _sqlite_fts_exists():
+                for statement in SQLITE_DDL:
+                    db.session.execute(text(statement))
+            _fts_ready = True
+        db.session.commit()
+    except DBAPIError as e:
+        db.session.rollback()
+        app.logger.warning(f"Search indexes not installed, falling back to LIKE: {e}")
+
+
+def _use_fts():
+    """SQLite FTS5 is used once the migration has created the table"""
+    global _fts_ready
+    if _fts_ready is None:
+        _fts_ready = db.engine.dialect.name == 'sqlite' and _sqlite_fts_exists()
+    return _fts_ready
+
+
+def _like_pattern(term):
+    escaped = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f'%{escaped}%'
+
+
+def _fts_phrase(term):
+    return '"' + term.replace('"', '""') + '"'
+
+
+def filter_query(query, terms=(), location=None):
+    """Restrict a Photo query to rows matching every term and the location
+
+    Each term must appear (as a substring, case-insensitively) in the
+    filename, description or location; ``location`` only in the location.
+    """
+    terms = [term for term in terms if term]
+    if _use_fts():
+        # 3자 이상은 FTS5 trigram, 더 짧은 검색어는 LIKE로 보충
+        phrases = [_fts_phrase(term) for term in terms if len(term) >= TRIGRAM_MIN_LENGTH]
+        if location and len(location) >= TRIGRAM_MIN_LENGTH:
+            phrases.append(f'photo_location : {_fts_phrase(location)}')
+        if phrases:
+            match = text('photo_fts MATCH :fts_query').bindparams(fts_query=' AND '.join(phrases))
+            query = query.filter(Photo.id.in_(select(photo_fts.c.rowid).where(match)))
+        terms = [term for term in terms if len(term) < TRIGRAM_MIN_LENGTH]
+        if location and len(location) >= TRIGRAM_MIN_LENGTH:
+            location = None
+
+    searchable = literal_column(SEARCH_EXPRESSION)
+    for index, term in enumerate(terms):
+        pattern = bindparam(f'search_term_{index}', _like_pattern(term))
+        query = query.filter(searchable.ilike(pattern, escape='\\'))
+    if location:
+        query = query.filter(Photo.photo_location.ilike(_like_pattern(location), escape='\\'))
+    return query
+
+
+def photo_query(terms=(), project_id=None, date_from=None, date_to=None, location=None):
+    """Photo query for the search API; ordering and paging are left to the caller"""
+    query = Photo.query
+    if project_id is not None:
+        query = query.filter(Photo.project_id == project_id)
+    if date_from:
+        query = query.filter(Photo.photo_date >= date_from)
+    if date_to:
+        query = query.filter(Photo.photo_date <= date_to)
+    return filter_query(query, terms, location)
@@ -0,0 +1,91 @@
+"""Contact-sheet sprites: a page of thumbnails packed into one image.
+
+Tiles sit on a fixed grid (SPRITE_TILE_SIZE square cells, SPRITE_COLUMNS
+per row) so the offset map is known without touching any image. Sprites are
+composited from the cached thumb renditions and keyed by a fingerprint of
+the photos on the page; when one photo changes only its thumbnail is
+re-rendered and the sheet re-assembled from the cached tiles.
+"""
+import os
+import hashlib
+import threading
+from app import app
+from models import Photo
+import imaging
+import metrics
+import renditions
+import storage
+
+BACKGROUND = (238, 240, 242)
+PENDING_COLOR = (222, 226, 230)
+
+
+def _source_version(photo):
+    try:
+        return renditions.source_version(photo)
+    except OSError:
+        return 0
+
+
+def fingerprint(photos):
+    """Changes whenever a photo on the page is added, removed, reordered or reprocessed"""
+    digest = hashlib.sha256(f"{app.config['SPRITE_TILE_SIZE']}|{app.config['SPRITE_COLUMNS']}".encode())
+    for photo in photos:
+        digest.update(f"\n{photo.id}|{photo.status}|{_source_version(photo)}".encode())
+    return digest.hexdigest()[:20]
+
+
+def sprite_path(project_id, key, fmt):
+    ext = renditions.RENDITION_FORMATS[fmt][2]
+    return os.path.join(app.config['UPLOAD_FOLDER'], str(project_id), renditions.RENDITION_DIRNAME,
+                        f"sprite_{key}.{ext}")
+
+
+def layout(count):
+    """(sheet width, sheet height, [(x, y), ...]) for ``count`` tiles"""
+    tile = app.config['SPRITE_TILE_SIZE']
+    columns = min(app.config['SPRITE_COLUMNS'], max(count, 1))
+    rows = max(1, -(-count // columns))
+    positions = [((index % columns) * tile, (index // columns) * tile) for index in range(count)]
+    return columns * tile, rows * tile, positions
+
+
+def _tile_image(photo, tile):
+    """Thumbnail scaled into a tile, or a flat placeholder while the photo is pending"""
+    from PIL import Image
+    if photo.status == Photo.STATUS_PENDING or not storage.exists(photo.filepath):
+        return Image.new('RGB', (tile, tile), PENDING_COLOR)
+    with Image.open(renditions.get_rendition(photo, 'thumb', 'jpeg')) as thumb:
+        thumb.load()
+        return imaging.fit_within(thumb, (tile, tile), 'fast').copy()
+
+
+def get_sprite(project_id, photos, fmt='jpeg'):
+    """Return (path, key) of the sprite for ``photos``, building it if it is not cached"""
+    from PIL import Image
+    key = fingerprint(photos)
+    path = sprite_path(project_id, key, fmt)
+    if os.path.exists(path):
+        metrics.RENDITION_CACHE.inc('sprite', fmt, 'hit')
+        return path, key
+
+    metrics.RENDITION_CACHE.inc('sprite', fmt, 'miss')
+    tile = app.config['SPRITE_TILE_SIZE']
+    width, height, positions = layout(len(photos))
+    sheet = Image.new('RGB', (width, height), BACKGROUND)
+    for photo, (x, y) in zip(photos, positions):
+        try:
+            img = _tile_image(photo, tile)
+        except Exception as e:
+            app.logger.error(f"Error adding photo {photo.id} to sprite: {e}")
+            continue
+        # 셀 안에서 가운데 정렬
+        sheet.paste(img, (x + (tile - img.width) // 2, y + (tile - img.height) // 2))
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with metrics.IMAGE_STAGE.time('sprite', 'encode'):
+        renditions.save_image(sheet, tmp_path, fmt)
+    os.replace(tmp_path, path)
+    renditions.record_write(path)
+    return path, key
@@ -0,0 +1,210 @@
+"""Where photo originals are kept.
+
+Blob.filepath and Photo.filepath hold storage keys (``ab/cd/<sha256><ext>``)
+relative to the configured backend, so the store can move to another disk or
+bucket by changing STORAGE_* settings instead of rewriting rows. Values that
+are not keys are filesystem paths written before keys existed; they are used
+as-is until ``flask migrate-storage`` moves them into the store.
+
+Pillow needs real files, so image work goes through local_path(). For the
+local backend that is the stored file itself; for S3 it is a copy in
+STORAGE_CACHE_FOLDER, which can be cleared at any time.
+"""
+import os
+import re
+import shutil
+import threading
+from app import app
+
+KEY_PATTERN = re.compile(r'^[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}(\.[0-9a-z]+)?$')
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def blob_key(digest, ext):
+    """Sharded key of a blob: ab/cd/<sha256><ext>"""
+    return f"{digest[:2]}/{digest[2:4]}/{digest}{ext.lower()}"
+
+
+def is_key(value):
+    return bool(value and KEY_PATTERN.match(value))
+
+
+def _tmp_name(path):
+    return f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+
+class LocalStorage:
+    """Sharded directory tree on a local or mounted filesystem"""
+
+    def __init__(self, root):
+        self.root = root
+
+    def path(self, key):
+        return os.path.join(self.root, *key.split('/'))
+
+    def local_path(self, key):
+        return self.path(key)
+
+    def exists(self, key):
+        return os.path.exists(self.path(key))
+
+    def stores(self, key, path):
+        """True if ``path`` already is the stored file for ``key``"""
+        try:
+            return os.path.samefile(self.path(key), path)
+        except OSError:
+            return False
+
+    def put(self, source_path, key, move=False):
+        """Store a file under ``key``; ``move`` lets a same-disk source be renamed into place"""
+        target = self.path(key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        if move:
+            shutil.move(source_path, target)
+        else:
+            tmp_path = _tmp_name(target)
+            shutil.copyfile(source_path, tmp_path)
+            os.replace(tmp_path, target)
+
+    def sync(self, key):
+        """Called after the file from local_path() was rewritten in place"""
+
+    def delete(self, key):
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
+
+    def url(self, key, disposition=None):
+        """Direct download URL, if the backend can serve files itself"""
+        return None
+
+
+class S3Storage:
+    """S3-compatible bucket (AWS S3, MinIO, ...) with a local copy for image work"""
+
+    def __init__(self, bucket, prefix='', endpoint_url=None, cache_root=None, client=None):
+        if client is None:
+            try:
+                import boto3
+            except ImportError:
+                raise RuntimeError("STORAGE_BACKEND=s3 requires boto3 (pip install boto3)")
+            client = boto3.client('s3', endpoint_url=endpoint_url or None)
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix
+        self.cache = LocalStorage(cache_root)
+
+    def _object(self, key):
+        return self.prefix + key
+
+    def _is_missing(self, error):
+        # botocore ClientError (임포트하지 않고 응답 코드로 판별)
+        response = getattr(error, 'response', None)
+        return isinstance(response, dict) and response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound')
+
+    def local_path(self, key):
+        path = self.cache.path(key)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = _tmp_name(path)
+            try:
+                self.client.download_file(self.bucket, self._object(key), tmp_path)
+            except Exception as e:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                if self._is_missing(e):
+                    raise FileNotFoundError(key)
+                raise
+            os.replace(tmp_path, path)
+        return path
+
+    def exists(self, key):
+        if self.cache.exists(key):
+            return True
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._object(key))
+        except Exception as e:
+            if self._is_missing(e):
+                return False
+            raise
+        return True
+
+    def stores(self, key, path):
+        return False
+
+    def put(self, source_path, key, move=False):
+        self.client.upload_file(source_path, self.bucket, self._object(key))
+        if move:
+            # 업로드 직후 압축 작업이 바로 읽으므로 로컬 사본으로 보관
+            self.cache.put(source_path, key, move=True)
+
+    def sync(self, key):
+        self.client.upload_file(self.cache.path(key), self.bucket, self._object(key))
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=self._object(key))
+        self.cache.delete(key)
+
+    def url(self, key, disposition=None):
+        params = {'Bucket': self.bucket, 'Key': self._object(key)}
+        if disposition:
+            params['ResponseContentDisposition'] = disposition
+        return self.client.generate_presigned_url('get_object', Params=params,
+                                                  ExpiresIn=app.config['STORAGE_URL_EXPIRES'])
+
+
+def create_backend(name):
+    """Instantiate a backend from the STORAGE_* settings"""
+    if name == 'local':
+        return LocalStorage(app.config['STORAGE_ROOT'])
+    if name == 's3':
+        return S3Storage(app.config['S3_BUCKET'], app.config['S3_PREFIX'], app.config['S3_ENDPOINT_URL'],
+                         app.config['STORAGE_CACHE_FOLDER'])
+    raise ValueError(f"Unknown storage backend: {name}")
+
+
+def backend():
+    """The configured backend, created on first use"""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = create_backend(app.config['STORAGE_BACKEND'])
+        return _backend
+
+
+# Photo.filepath / Blob.filepath 값을 받는 함수 (키가 아니면 기존 로컬 경로)
+
+def local_path(value):
+    """A local file with the content of ``value``; raises FileNotFoundError if it is gone"""
+    return backend().local_path(value) if is_key(value) else value
+
+
+def stored_locally(value):
+    """True if local_path(value) is the stored file itself rather than a cached copy"""
+    return not is_key(value) or isinstance(backend(), LocalStorage)
+
+
+def exists(value):
+    return backend().exists(value) if is_key(value) else os.path.exists(value)
+
+
+def sync(value):
+    if is_key(value):
+        backend().sync(value)
+
+
+def delete(value):
+    if is_key(value):
+        backend().delete(value)
+    else:
+        try:
+            os.remove(value)
+        except FileNotFoundError:
+            pass
+
+
+def url(value, disposition=None):
+    return backend().url(value, disposition) if is_key(value) else None
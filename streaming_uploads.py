@@ -0,0 +1,137 @@
+"""Incremental multipart/form-data parsing for photo uploads.
+
+Werkzeug's form parser spools every file part to a temporary file before the
+view runs, which the view then copies into the blob store. Here the request
+body is parsed as it arrives and each file part is written straight into the
+blob store's temporary area, hashed, size-checked, sniffed and its EXIF
+header parsed on the way.
+"""
+import io
+from werkzeug.datastructures import MultiDict
+from werkzeug.sansio.multipart import Data, Epilogue, Field, File, MultipartDecoder, NeedData
+from app import app
+import blobs
+import imaging
+
+READ_SIZE = 256 * 1024
+HEADER_BYTES = 256 * 1024  # 포맷/EXIF 파싱용으로 메모리에 보관하는 앞부분
+SNIFF_BYTES = 16
+
+
+class UploadError(ValueError):
+    """Raised when the request body cannot be parsed; the message is safe to show to users"""
+
+
+class UploadPart:
+    """One file part written to the blob store's temporary area"""
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.writer = blobs.BlobWriter()
+        self.head = bytearray()
+        self.format = None
+        self.metadata = None
+        self.error = None
+
+    @property
+    def size(self):
+        return self.writer.size
+
+    def write(self, data, max_bytes):
+        if self.error:
+            return
+        if self.writer.size + len(data) > max_bytes:
+            self.reject(f'파일 크기가 {max_bytes // (1024 * 1024)}MB를 초과합니다.')
+            return
+        self.writer.write(data)
+        if len(self.head) < HEADER_BYTES:
+            self.head += data[:HEADER_BYTES - len(self.head)]
+        if self.format is None and len(self.head) >= SNIFF_BYTES:
+            self._sniff()
+
+    def finish(self):
+        """Called at the end of the part: parse dimensions and EXIF from the buffered bytes"""
+        if self.error:
+            return
+        if self.format is None:
+            self._sniff()
+            if self.error:
+                return
+        self.metadata = imaging.read_metadata(io.BytesIO(self.head))
+        if self.metadata is None and self.size <= len(self.head):
+            # 파일 전체를 읽었는데도 헤더를 해석할 수 없음
+            self.reject('손상된 이미지 파일입니다.')
+        del self.head[:]
+
+    def _sniff(self):
+        self.format = imaging.sniff_format(bytes(self.head[:SNIFF_BYTES]))
+        if self.format is None:
+            # 이미지가 아니면 나머지를 디스크에 쓰지 않음
+            self.reject('이미지 파일이 아닙니다.')
+
+    def reject(self, reason):
+        self.error = reason
+        self.writer.discard()
+
+    def commit(self, ext):
+        """Move the part into the blob store; returns (blob, created) like blobs.store_stream"""
+        return self.writer.commit(ext)
+
+    def discard(self):
+        self.writer.discard()
+
+
+def parse_upload(stream, boundary, accept_file):
+    """Parse a multipart body, streaming accepted file parts into the blob store
+
+    ``accept_file(field_name, filename)`` selects the file parts to keep;
+    other parts are read and dropped. Returns ``(fields, parts)``: the form
+    fields as a MultiDict and an UploadPart per kept file. Parts rejected
+    while reading (too large, not an image, corrupt) keep their ``error``
+    and have nothing left on disk. Callers must commit or discard the rest.
+    """
+    decoder = MultipartDecoder(boundary, max_form_memory_size=app.config['MAX_FORM_MEMORY_SIZE'],
+                               max_parts=app.config['MAX_FORM_PARTS'])
+    max_bytes = app.config['UPLOAD_MAX_FILE_BYTES']
+    fields = MultiDict()
+    parts = []
+    field_name = field_data = current = None
+
+    try:
+        while True:
+            try:
+                event = decoder.next_event()
+            except ValueError as e:
+                app.logger.error(f"Malformed multipart body: {e}")
+                raise UploadError('업로드 데이터가 올바르지 않습니다. 다시 시도해주세요.')
+
+            if isinstance(event, NeedData):
+                data = stream.read(READ_SIZE)
+                decoder.receive_data(data or None)
+            elif isinstance(event, Epilogue):
+                break
+            elif isinstance(event, Field):
+                field_name, field_data, current = event.name, [], None
+            elif isinstance(event, File):
+                field_name = field_data = current = None
+                if event.filename and accept_file(event.name, event.filename):
+                    current = UploadPart(event.filename)
+                    parts.append(current)
+            elif isinstance(event, Data):
+                if field_data is not None:
+                    field_data.append(event.data)
+                    if not event.more_data:
+                        fields.add(field_name, b''.join(field_data).decode('utf-8', 'replace'))
+                        field_data = None
+                elif current is not None:
+                    current.write(event.data, max_bytes)
+                    if not event.more_data:
+                        current.finish()
+                        current = None
+    except BaseException:
+        # 413, 연결 끊김 등: 이미 기록한 임시 파일 정리
+        for part in parts:
+            part.discard()
+        raise
+
+    return fields, parts
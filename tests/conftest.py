@@ -0,0 +1,19 @@
+import os
+import sys
+import tempfile
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# config는 임포트 시점에 환경 변수를 읽으므로 앱을 만들기 전에 설정
+_workdir = tempfile.mkdtemp(prefix='photo-tests-')
+os.environ.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(_workdir, 'test.db')}")
+os.environ['UPLOAD_FOLDER'] = os.path.join(_workdir, 'uploads')
+os.environ.setdefault('APP_ENV', 'production')
+
+
+@pytest.fixture(scope='session')
+def app():
+    from app import create_app
+    return create_app()
@@ -0,0 +1,25 @@
+"""Cold start stays within STARTUP_BUDGET_MS and the web process does not load Pillow."""
+import statistics
+import subprocess
+import sys
+
+
+def test_startup_within_budget(app):
+    from app import measure_startup
+    samples = measure_startup(3)
+    assert statistics.median(samples) <= app.config['STARTUP_BUDGET_MS']
+
+
+def test_create_app_does_not_import_pillow(app):
+    code = "import sys, main; print('PIL.Image' in sys.modules)"
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True,
+                            cwd=app.root_path, check=True)
+    assert result.stdout.split()[-1] == 'False'
+
+
+def test_create_app_returns_a_fresh_app(app):
+    from app import create_app
+    other = create_app()
+    assert other is not app
+    assert set(other.view_functions) == set(app.view_functions)
+    assert set(other.cli.commands) == set(app.cli.commands)
@@ -0,0 +1,84 @@
+"""S3 backend against moto's in-process S3 stand-in (no network or bucket needed)."""
+import os
+import pytest
+from PIL import Image
+
+boto3 = pytest.importorskip('boto3')
+moto = pytest.importorskip('moto')
+
+BUCKET = 'site-photos'
+
+
+@pytest.fixture
+def s3(app, tmp_path, monkeypatch):
+    import storage
+    with moto.mock_aws():
+        client = boto3.client('s3', region_name='us-east-1')
+        client.create_bucket(Bucket=BUCKET)
+        backend = storage.S3Storage(BUCKET, 'originals/', cache_root=str(tmp_path / 'cache'), client=client)
+        monkeypatch.setattr(storage, '_backend', backend)
+        yield backend
+
+
+def _jpeg(path, color='red'):
+    Image.new('RGB', (640, 480), color).save(path, 'JPEG')
+    return str(path)
+
+
+def _object_keys(backend):
+    return [item['Key'] for item in backend.client.list_objects_v2(Bucket=BUCKET).get('Contents', [])]
+
+
+def test_round_trip(s3, tmp_path):
+    import storage
+    key = storage.blob_key('ab' * 32, '.jpg')
+    source = _jpeg(tmp_path / 'upload.jpg')
+    size = os.path.getsize(source)
+
+    s3.put(source, key, move=True)
+    assert not os.path.exists(source)
+    assert _object_keys(s3) == ['originals/' + key]
+    assert storage.exists(key)
+
+    # 로컬 사본을 지워도 버킷에서 다시 받음
+    os.remove(s3.cache.path(key))
+    assert storage.exists(key)
+    local = storage.local_path(key)
+    assert os.path.getsize(local) == size
+
+    # 제자리에서 바꾼 파일은 sync로 버킷에 반영
+    _jpeg(local, 'blue')
+    storage.sync(key)
+    os.remove(local)
+    with Image.open(storage.local_path(key)) as img:
+        assert img.getpixel((0, 0))[2] > 200
+
+    url = storage.url(key, 'attachment; filename=a.jpg')
+    assert BUCKET in url and key in url and 'response-content-disposition' in url
+
+    storage.delete(key)
+    assert not storage.exists(key)
+    assert not os.path.exists(s3.cache.path(key))
+    with pytest.raises(FileNotFoundError):
+        storage.local_path(key)
+
+
+def test_renditions_survive_cache_eviction(s3, tmp_path):
+    import storage
+    import renditions
+    from models import Photo
+    digest = 'cd' * 32
+    key = storage.blob_key(digest, '.jpg')
+    s3.put(_jpeg(tmp_path / 'upload.jpg'), key, move=True)
+    photo = Photo(id=1, project_id=1, filename='a.jpg', filepath=key, blob_hash=digest,
+                  status=Photo.STATUS_READY)
+
+    first = renditions.get_rendition(photo, 'thumb', 'jpeg')
+    # 렌디션 키는 내용 해시 기준이므로 로컬 사본을 지워도 그대로 적중하고 원본을 다시 받지 않음
+    os.remove(s3.cache.path(key))
+    assert renditions.get_rendition(photo, 'thumb', 'jpeg') == first
+    assert not os.path.exists(s3.cache.path(key))
+
+    # 압축 완료 전 원본으로 만든 렌디션과는 구분
+    photo.status = Photo.STATUS_PENDING
+    assert renditions.rendition_path(photo, 'thumb', renditions.source_version(photo)) != first